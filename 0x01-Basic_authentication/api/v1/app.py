@@ -6,6 +6,7 @@ from os import getenv
 from api.v1.views import app_views
 from flask import Flask, abort, jsonify, request
 from flask_cors import (CORS, cross_origin)
+from models.base import Base
 import os
 
 
@@ -26,8 +27,10 @@ elif getenv('AUTH_TYPE') == 'basic_auth':
 @app.before_request
 def before_request():
     """
-    Filters request
+    Filters request, after reloading the model files other processes
+    wrote
     """
+    Base.sync()
     if auth is None:
         pass
     else:
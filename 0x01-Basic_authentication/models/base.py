@@ -4,12 +4,75 @@
 from datetime import datetime
 from typing import List, TypeVar, Iterable
 from os import path
+import fcntl
 import json
+import os
+import threading
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+LOADED = {}
+STAMPS = {}
+
+
+class StoreLock():
+    """ Reentrant lock serializing the writes of the model files between
+    the threads of a process and, with flock on a lock file, between the
+    processes sharing the files (pre-forked workers, scripts)
+    """
+
+    def __init__(self, file_path: str):
+        """ Initialize a StoreLock on file_path
+        """
+        self.file_path = file_path
+        self.thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        """ Take the thread lock, and the file lock if not already held
+        """
+        self.thread_lock.acquire()
+        if self._depth == 0:
+            # opened on every acquisition: a descriptor inherited through
+            # fork would share its flock with the other processes
+            try:
+                self._file = open(self.file_path, 'a')
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self.thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *args):
+        """ Release the lock, and the file lock with the outermost hold
+        """
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self.thread_lock.release()
+
+
+STORE_LOCK = StoreLock(".db.lock")
+
+
+def _stamp(file_path: str):
+    """ Return what identifies the content of a file: its inode, size
+    and modification time, or None if it does not exist
+    """
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
 
 
 class Base():
@@ -63,14 +126,32 @@ class Base():
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
+        with STORE_LOCK:
+            LOADED[s_class] = cls
+            objs = {}
+            STAMPS[s_class] = _stamp(file_path)
+            if path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    objs_json = json.load(f)
+                    for obj_id, obj_json in objs_json.items():
+                        objs[obj_id] = cls(**obj_json)
+            DATA[s_class] = objs
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+    @classmethod
+    def sync(cls):
+        """ Reload the objects of the class, or of every loaded class when
+        called on Base, whose file was written by another process since
+        this one last read or wrote it
+        """
+        classes = list(LOADED.values()) if cls is Base else [cls]
+        for model in classes:
+            s_class = model.__name__
+            file_path = ".db_{}.json".format(s_class)
+            if _stamp(file_path) == STAMPS.get(s_class):
+                continue
+            with STORE_LOCK:
+                if _stamp(file_path) != STAMPS.get(s_class):
+                    model.load_from_file()
 
     @classmethod
     def save_to_file(cls):
@@ -78,28 +159,36 @@ class Base():
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        with STORE_LOCK:
+            objs_json = {}
+            for obj_id, obj in DATA[s_class].items():
+                objs_json[obj_id] = obj.to_json(True)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+            with open(file_path + ".tmp", 'w') as f:
+                json.dump(objs_json, f)
+            os.replace(file_path + ".tmp", file_path)
+            STAMPS[s_class] = _stamp(file_path)
 
     def save(self):
-        """ Save current object
+        """ Save current object, on top of the objects other processes
+        saved to file
         """
         s_class = self.__class__.__name__
-        self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        with STORE_LOCK:
+            self.__class__.sync()
+            self.updated_at = datetime.utcnow()
+            DATA[s_class][self.id] = self
+            self.__class__.save_to_file()
 
     def remove(self):
         """ Remove object
         """
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        with STORE_LOCK:
+            self.__class__.sync()
+            if DATA[s_class].get(self.id) is not None:
+                del DATA[s_class][self.id]
+                self.__class__.save_to_file()
 
     @classmethod
     def count(cls) -> int:
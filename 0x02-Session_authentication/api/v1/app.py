@@ -3,78 +3,165 @@
 Route module for the API
 """
 from os import getenv
+from api.v1 import metrics
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
+from importlib import import_module
+from models.base import Base
+from models.user import User
 import os
+import threading
 
 
-app = Flask(__name__)
-app.register_blueprint(app_views)
-CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
+AUTH_BACKENDS = {
+    "auth": "api.v1.auth.auth.Auth",
+    "basic_auth": "api.v1.auth.basic_auth.BasicAuth",
+    "session_auth": "api.v1.auth.session_auth.SessionAuth",
+    "session_exp_auth": "api.v1.auth.session_exp_auth.SessionExpAuth",
+    "session_db_auth": "api.v1.auth.session_db_auth.SessionDBAuth",
+    "session_signed_auth":
+        "api.v1.auth.session_signed_auth.SessionSignedAuth",
+}
+AUTH_STAGES = [
+    'require_auth',
+    'authorization_header',
+    'session_cookie',
+    'current_user',
+    'extract_base64_authorization_header',
+    'decode_base64_authorization_header',
+    'extract_user_credentials',
+    'user_object_from_credentials'
+]
+MODEL_OPERATIONS = [
+    'load_from_file',
+    'save_to_file',
+    'save',
+    'remove',
+    'get',
+    'search'
+]
+LIGHT_PATHS = [
+    '/api/v1/status',
+    '/api/v1/status/',
+    '/api/v1/metrics',
+    '/api/v1/metrics/'
+]
+
 auth = None
-AUTH_TYPE = os.getenv("AUTH_TYPE")
-if AUTH_TYPE == "auth":
-    from api.v1.auth.auth import Auth
-    auth = Auth()
-elif AUTH_TYPE == "basic_auth":
-    from api.v1.auth.basic_auth import BasicAuth
-    auth = BasicAuth()
-elif AUTH_TYPE == "session_auth":
-    from api.v1.auth.session_auth import SessionAuth
-    auth = SessionAuth()
-elif AUTH_TYPE == "session_exp_auth":
-    from api.v1.auth.session_exp_auth import SessionExpAuth
-    auth = SessionExpAuth()
-elif AUTH_TYPE == "session_db_auth":
-    from api.v1.auth.session_db_auth import SessionDBAuth
-    auth = SessionDBAuth()
-
-
-@app.before_request
+_models_loaded = threading.Event()
+_models_lock = threading.Lock()
+
+
+def load_auth(auth_type: str):
+    """
+    Import and instantiate only the backend registered for auth_type
+    Return:
+        the Auth instance or None if auth_type is not registered
+    """
+    path = AUTH_BACKENDS.get(auth_type)
+    if path is None:
+        return None
+    module_name, class_name = path.rsplit('.', 1)
+    backend = getattr(import_module(module_name), class_name)()
+    metrics.instrument(type(backend), AUTH_STAGES, metrics.family(
+        'auth_stage_seconds', 'Time spent in each authentication stage',
+        'stage'))
+    return backend
+
+
+def load_models():
+    """
+    Load the model data and the auth backend data from file once, on the
+    first request that needs it or from the warm-up thread
+    """
+    if _models_loaded.is_set():
+        return
+    with _models_lock:
+        if not _models_loaded.is_set():
+            User.load_from_file()
+            if auth is not None:
+                auth.load_data()
+            _models_loaded.set()
+
+
 def bef_req():
     """
-    Filter each request before it's handled by the proper route
+    Filter each request before it's handled by the proper route, after
+    reloading the model files other processes wrote
     """
+    if request.path in LIGHT_PATHS:
+        setattr(request, "current_user", None)
+        return
+    load_models()
+    Base.sync()
     if auth is None:
         pass
     else:
-        setattr(request, "current_user", auth.current_user(request))
+        current_user = auth.current_user(request)
+        setattr(request, "current_user", current_user)
         excluded = [
             '/api/v1/status/',
             '/api/v1/unauthorized/',
             '/api/v1/forbidden/',
-            '/api/v1/auth_session/login/'
+            '/api/v1/auth_session/login/',
+            '/api/v1/metrics/'
         ]
         if auth.require_auth(request.path, excluded):
             cookie = auth.session_cookie(request)
             if auth.authorization_header(request) is None and cookie is None:
                 abort(401, description="Unauthorized")
-            if auth.current_user(request) is None:
+            if current_user is None:
                 abort(403, description="Forbidden")
 
 
-@app.errorhandler(404)
 def not_found(error) -> str:
     """ Not found handler
     """
     return jsonify({"error": "Not found"}), 404
 
 
-@app.errorhandler(401)
 def unauthorized(error) -> str:
     """ Request unauthorized handler
     """
     return jsonify({"error": "Unauthorized"}), 401
 
 
-@app.errorhandler(403)
 def forbidden(error) -> str:
     """ Request unauthorized handler
     """
     return jsonify({"error": "Forbidden"}), 403
 
 
+def create_app(auth_type: str = None) -> Flask:
+    """
+    Build the API application. The auth backend selected by auth_type
+    (AUTH_TYPE by default) becomes the module level auth used by the
+    views. User data is loaded on the first request that needs it, or
+    right away in a background thread when WARM_UP=true
+    """
+    global auth
+    if auth_type is None:
+        auth_type = os.getenv("AUTH_TYPE")
+    application = Flask(__name__)
+    application.register_blueprint(app_views)
+    CORS(application, resources={r"/api/v1/*": {"origins": "*"}})
+    application.before_request(bef_req)
+    application.register_error_handler(404, not_found)
+    application.register_error_handler(401, unauthorized)
+    application.register_error_handler(403, forbidden)
+    auth = load_auth(auth_type)
+    metrics.instrument(Base, MODEL_OPERATIONS, metrics.family(
+        'model_operation_seconds',
+        'Time spent in each model persistence call', 'operation'))
+    if os.getenv('WARM_UP', 'false').lower() == 'true':
+        threading.Thread(target=load_models, daemon=True).start()
+    return application
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
     host = getenv("API_HOST", "0.0.0.0")
     port = getenv("API_PORT", "5000")
@@ -12,8 +12,12 @@ from typing import (
 
 class Auth:
     """
-    Manages the API authentication
+    Manages the API authentication. background_tasks is cleared by the
+    pre-fork server: periodic tasks then only start in after_fork, in
+    the workers, never in the master
     """
+    background_tasks = True
+
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
         """
         Determines whether a given path requires authentication or not
@@ -70,3 +74,27 @@ class Auth:
             return None
         session_name = os.getenv('SESSION_NAME')
         return request.cookies.get(session_name)
+
+    def destroy_all_sessions(self, user_id: str = None) -> int:
+        """
+        Revokes every session of a user
+        Args:
+            user_id (str): user's user id
+        Return:
+            number of revoked sessions, always 0 without sessions
+        """
+        return 0
+
+    def load_data(self):
+        """
+        Loads the data the backend keeps on disk, called once by
+        load_models before the first authenticated request
+        """
+        pass
+
+    def after_fork(self):
+        """
+        Starts the background tasks of the backend in a forked worker,
+        threads of the master process do not survive fork
+        """
+        pass
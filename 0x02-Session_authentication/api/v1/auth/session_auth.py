@@ -3,10 +3,13 @@
 Definition of class SessionAuth
 """
 import base64
+import os
+import threading
 from uuid import uuid4
-from typing import TypeVar
+from typing import Iterable, TypeVar
 
 from .auth import Auth
+from .session_filter import SessionFilter
 from models.user import User
 
 
@@ -14,6 +17,69 @@ class SessionAuth(Auth):
     """ Implement Session Authorization protocol methods
     """
     user_id_by_session_id = {}
+    session_ids_by_user_id = {}
+    session_filter = None
+
+    def __init__(self):
+        """
+        Initialize the class. With SESSION_FILTER=true unknown Session
+        IDs are rejected by a Bloom filter sized by
+        SESSION_FILTER_CAPACITY and SESSION_FILTER_FP_RATE and rebuilt
+        every SESSION_FILTER_REBUILD seconds
+        """
+        if os.getenv('SESSION_FILTER', 'false').lower() != 'true':
+            return
+        try:
+            capacity = int(os.getenv('SESSION_FILTER_CAPACITY'))
+        except Exception:
+            capacity = 100000
+        try:
+            fp_rate = float(os.getenv('SESSION_FILTER_FP_RATE'))
+        except Exception:
+            fp_rate = 0.01
+        try:
+            interval = int(os.getenv('SESSION_FILTER_REBUILD'))
+        except Exception:
+            interval = 3600
+        self.session_filter = SessionFilter(capacity, fp_rate)
+        self.filter_rebuild_interval = interval
+        self.rebuild_session_filter()
+        if interval > 0 and self.background_tasks:
+            self._schedule_filter_rebuild()
+
+    def after_fork(self):
+        """
+        Starts the periodic filter rebuild in a forked worker
+        """
+        if self.session_filter is not None and \
+                self.filter_rebuild_interval > 0:
+            self._schedule_filter_rebuild()
+
+    def _live_session_ids(self) -> Iterable[str]:
+        """
+        Returns the Session IDs currently known to the session store
+        """
+        return self.user_id_by_session_id.keys()
+
+    def rebuild_session_filter(self):
+        """
+        Rebuilds the Session ID filter from the live sessions
+        """
+        if self.session_filter is not None:
+            self.session_filter.rebuild(self._live_session_ids())
+
+    def _schedule_filter_rebuild(self):
+        """
+        Run rebuild_session_filter every SESSION_FILTER_REBUILD seconds
+        """
+        def run():
+            try:
+                self.rebuild_session_filter()
+            finally:
+                self._schedule_filter_rebuild()
+        timer = threading.Timer(self.filter_rebuild_interval, run)
+        timer.daemon = True
+        timer.start()
 
     def create_session(self, user_id: str = None) -> str:
         """
@@ -28,6 +94,11 @@ class SessionAuth(Auth):
             return None
         id = uuid4()
         self.user_id_by_session_id[str(id)] = user_id
+        self.session_ids_by_user_id.setdefault(user_id, set()).add(str(id))
+        if self.session_filter is not None:
+            self.session_filter.add(str(id))
+            if self.session_filter.count > self.session_filter.capacity:
+                self.rebuild_session_filter()
         return str(id)
 
     def user_id_for_session_id(self, session_id: str = None) -> str:
@@ -51,7 +122,17 @@ class SessionAuth(Auth):
             User instance
         """
         session_cookie = self.session_cookie(request)
+        if session_cookie is None:
+            return None
+        session_filter = self.session_filter
+        if session_filter is not None and \
+                not session_filter.might_contain(session_cookie):
+            return None
         user_id = self.user_id_for_session_id(session_cookie)
+        if user_id is None:
+            if session_filter is not None:
+                session_filter.record_miss(session_cookie)
+            return None
         user = User.get(user_id)
         return user
 
@@ -67,5 +148,36 @@ class SessionAuth(Auth):
         user_id = self.user_id_for_session_id(session_cookie)
         if user_id is None:
             return False
-        del self.user_id_by_session_id[session_cookie]
+        self._forget_session(session_cookie)
         return True
+
+    def _forget_session(self, session_id: str):
+        """
+        Drops a session ID from user_id_by_session_id and from the
+        session_ids_by_user_id reverse index
+        """
+        details = self.user_id_by_session_id.pop(session_id, None)
+        if self.session_filter is not None:
+            self.session_filter.forget(session_id)
+        if isinstance(details, dict):
+            details = details.get("user_id")
+        session_ids = self.session_ids_by_user_id.get(details)
+        if session_ids is not None:
+            session_ids.discard(session_id)
+            if not session_ids:
+                del self.session_ids_by_user_id[details]
+
+    def destroy_all_sessions(self, user_id: str = None) -> int:
+        """
+        Deletes every session of a user
+        Args:
+            user_id (str): user's user id
+        Return:
+            number of deleted sessions
+        """
+        session_ids = self.session_ids_by_user_id.pop(user_id, set())
+        for session_id in session_ids:
+            self.user_id_by_session_id.pop(session_id, None)
+            if self.session_filter is not None:
+                self.session_filter.forget(session_id)
+        return len(session_ids)
@@ -2,16 +2,65 @@
 """
 Define class SessionDButh
 """
+import os
+import threading
+from datetime import datetime
+from time import perf_counter
+from typing import Tuple
+
 from .session_exp_auth import SessionExpAuth
+from models.base import STORE_LOCK
 from models.user_session import UserSession
 
 
 class SessionDBAuth(SessionExpAuth):
     """
     Definition of SessionDBAuth class that persists session data
-    in a database
+    in a database. user_id_by_session_id is kept as a write-through
+    cache in front of the UserSession store
     """
 
+    def __init__(self):
+        """
+        Initialize the class, persisted sessions are loaded by load_data
+        so startup does not depend on the size of the session file
+        """
+        super().__init__()
+        try:
+            interval = int(os.getenv('SESSION_PURGE_INTERVAL'))
+        except Exception:
+            interval = 0
+        self.purge_interval = interval
+        self._touched = {}
+        self._last_flush = datetime.utcnow()
+        self._loaded = False
+
+    def load_data(self):
+        """
+        Load persisted sessions, rebuild the filter from them and start
+        the periodic purge, which must never run on an unloaded store nor
+        in the master of the pre-fork server
+        """
+        UserSession.load_from_file()
+        self.rebuild_session_filter()
+        self._loaded = True
+        if self.purge_interval > 0 and self.background_tasks:
+            self._schedule_purge()
+
+    def after_fork(self):
+        """
+        Starts the periodic filter rebuild and purge in a forked worker
+        """
+        super().after_fork()
+        if self._loaded and self.purge_interval > 0:
+            self._schedule_purge()
+
+    def _live_session_ids(self):
+        """
+        Returns the Session IDs of the persisted sessions
+        """
+        return UserSession.session_ids()
+
     def create_session(self, user_id=None):
         """
         Create a Session ID for a user_id
@@ -27,6 +76,10 @@ class SessionDBAuth(SessionExpAuth):
         }
         user = UserSession(**kw)
         user.save()
+        self.user_id_by_session_id[session_id] = {
+            "user_id": user.user_id,
+            "created_at": user.created_at
+        }
         return session_id
 
     def user_id_for_session_id(self, session_id=None):
@@ -35,12 +88,59 @@ class SessionDBAuth(SessionExpAuth):
         Args:
             session_id (str): session ID
         Return:
-            user id or None if session_id is None or not a string
+            user id or None if session_id is None or not a string,
+            unknown or expired
         """
-        user_id = UserSession.search({"session_id": session_id})
-        if user_id:
-            return user_id
-        return None
+        if session_id is None or not isinstance(session_id, str):
+            return None
+        user_details = self.user_id_by_session_id.get(session_id)
+        if user_details is None:
+            user_session = UserSession.get_by_session_id(session_id)
+            if user_session is None:
+                return None
+            user_details = {
+                "user_id": user_session.user_id,
+                "created_at": user_session.created_at,
+                "last_seen": user_session.last_seen
+            }
+            self.user_id_by_session_id[session_id] = user_details
+        if not self._is_live(session_id, user_details, datetime.utcnow()):
+            self._forget_session(session_id)
+            return None
+        return user_details.get("user_id")
+
+    def _touch(self, session_id: str, now: datetime):
+        """
+        Record that a sliding session was seen, the UserSession store is
+        written by flush_touches at most once per touch_granularity.
+        Only the thread side of the store lock is needed until a flush
+        """
+        with STORE_LOCK.thread_lock:
+            self._touched[session_id] = now
+            elapsed = (now - self._last_flush).total_seconds()
+            if elapsed >= self.touch_granularity:
+                self.flush_touches()
+
+    def flush_touches(self) -> int:
+        """
+        Copy pending last_seen updates to their UserSession and persist
+        them with a single file write
+        Return:
+            number of sessions updated
+        """
+        with STORE_LOCK:
+            UserSession.sync()
+            touched, self._touched = self._touched, {}
+            self._last_flush = datetime.utcnow()
+            count = 0
+            for session_id, last_seen in touched.items():
+                user_session = UserSession.get_by_session_id(session_id)
+                if user_session is not None:
+                    user_session.last_seen = last_seen
+                    count += 1
+            if count:
+                UserSession.save_to_file()
+        return count
 
     def destroy_session(self, request=None):
         """
@@ -52,8 +152,56 @@ class SessionDBAuth(SessionExpAuth):
         session_id = self.session_cookie(request)
         if not session_id:
             return False
-        user_session = UserSession.search({"session_id": session_id})
-        if user_session:
-            user_session[0].remove()
-            return True
+        self._forget_session(session_id)
+        with STORE_LOCK:
+            self._touched.pop(session_id, None)
+            user_session = UserSession.get_by_session_id(session_id)
+            if user_session:
+                user_session.remove()
+                return True
         return False
+
+    def destroy_all_sessions(self, user_id: str = None) -> int:
+        """
+        Destroy every UserSession of a user with a single file write
+        Args:
+            user_id (str): user id
+        Return:
+            number of destroyed sessions
+        """
+        with STORE_LOCK:
+            removed = UserSession.remove_by_user_id(user_id)
+            for session_id in removed:
+                self._touched.pop(session_id, None)
+        for session_id in removed:
+            self._forget_session(session_id)
+        self.session_ids_by_user_id.pop(user_id, None)
+        return len(removed)
+
+    def purge_expired_sessions(self) -> Tuple[int, float]:
+        """
+        Delete every UserSession past SESSION_DURATION in one batch
+        Return:
+            number of purged sessions and the time it took in seconds
+        """
+        start = perf_counter()
+        with STORE_LOCK:
+            self.flush_touches()
+            purged = UserSession.purge_expired(self.session_duration)
+        for session_id in purged:
+            self._forget_session(session_id)
+        return len(purged), perf_counter() - start
+
+    def _schedule_purge(self):
+        """
+        Run purge_expired_sessions every SESSION_PURGE_INTERVAL seconds,
+        a failed purge does not stop the next ones
+        """
+        def run():
+            try:
+                self.purge_expired_sessions()
+            finally:
+                self._schedule_purge()
+        timer = threading.Timer(self.purge_interval, run)
+        timer.daemon = True
+        timer.start()
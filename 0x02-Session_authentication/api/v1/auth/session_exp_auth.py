@@ -14,17 +14,27 @@ from .session_auth import SessionAuth
 class SessionExpAuth(SessionAuth):
     """
     Definition of class SessionExpAuth that adds an
-    expiration date to a Session ID
+    expiration date to a Session ID. With SESSION_SLIDING=true the
+    window restarts from the last time the session was seen, which is
+    refreshed at most once every SESSION_TOUCH_GRANULARITY seconds
     """
     def __init__(self):
         """
         Initialize the class
         """
+        super().__init__()
         try:
             duration = int(os.getenv('SESSION_DURATION'))
         except Exception:
             duration = 0
         self.session_duration = duration
+        sliding = os.getenv('SESSION_SLIDING', 'false')
+        self.sliding = sliding.lower() == 'true'
+        try:
+            granularity = int(os.getenv('SESSION_TOUCH_GRANULARITY'))
+        except Exception:
+            granularity = 60
+        self.touch_granularity = granularity
 
     def create_session(self, user_id=None):
         """
@@ -57,10 +67,34 @@ class SessionExpAuth(SessionAuth):
             return None
         if "created_at" not in user_details.keys():
             return None
-        if self.session_duration <= 0:
-            return user_details.get("user_id")
-        created_at = user_details.get("created_at")
-        allowed_window = created_at + timedelta(seconds=self.session_duration)
-        if allowed_window < datetime.now():
+        if not self._is_live(session_id, user_details, datetime.now()):
+            self._forget_session(session_id)
             return None
         return user_details.get("user_id")
+
+    def _is_live(self, session_id: str, user_details: dict,
+                 now: datetime) -> bool:
+        """
+        Checks whether a session is inside its allowed window and, for
+        sliding sessions, moves last_seen forward when it is older than
+        touch_granularity
+        """
+        if self.session_duration <= 0:
+            return True
+        last_seen = user_details.get("last_seen") if self.sliding else None
+        start = last_seen or user_details.get("created_at")
+        allowed_window = start + timedelta(seconds=self.session_duration)
+        if allowed_window < now:
+            return False
+        if self.sliding and (last_seen is None or (now - last_seen)
+                             .total_seconds() >= self.touch_granularity):
+            user_details["last_seen"] = now
+            self._touch(session_id, now)
+        return True
+
+    def _touch(self, session_id: str, now: datetime):
+        """
+        Hook called when a sliding session is seen, sessions kept in
+        memory have nothing else to update
+        """
+        pass
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Definition of class SessionFilter
+"""
+import hashlib
+import math
+import threading
+from typing import Iterable
+
+
+class SessionFilter:
+    """
+    Bloom filter of live Session IDs. A negative answer means the
+    Session ID was never created so the session store does not need to
+    be consulted, a positive answer may be a false positive. Destroyed
+    sessions stay in the filter until the next rebuild, and are recorded
+    so store misses on them are not counted as false positives
+    """
+    def __init__(self, capacity: int = 100000, fp_rate: float = 0.01):
+        """
+        Initialize an empty filter sized for capacity Session IDs at the
+        fp_rate false positive rate
+        """
+        self.fp_rate = fp_rate
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = None
+        self._forgotten = set()
+        self._forgotten_while_rebuilding = None
+        self.checks = 0
+        self.rejected = 0
+        self.false_positives = 0
+        self.stale_hits = 0
+        self._reset(capacity)
+
+    def _reset(self, capacity: int):
+        """
+        Allocate a new bit array for capacity items
+        """
+        self.capacity = max(capacity, 1)
+        size = -self.capacity * math.log(self.fp_rate) / (math.log(2) ** 2)
+        self.size = max(int(math.ceil(size)), 8)
+        self.hashes = max(int(round(self.size / self.capacity *
+                                    math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._state = (self.bits, self.size, self.hashes)
+
+    @staticmethod
+    def _positions(session_id: str, size: int,
+                   hashes: int) -> Iterable[int]:
+        """
+        Return the bit positions of a Session ID using double hashing
+        """
+        digest = hashlib.blake2b(session_id.encode('utf-8'),
+                                 digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % size for i in range(hashes)]
+
+    def _add(self, session_id: str):
+        """
+        Set the bits of a Session ID without locking
+        """
+        bits, size, hashes = self._state
+        for pos in self._positions(session_id, size, hashes):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def add(self, session_id: str):
+        """
+        Add a Session ID to the filter
+        """
+        with self._lock:
+            self._add(session_id)
+            if self._rebuilding is not None:
+                self._rebuilding.append(session_id)
+
+    def forget(self, session_id: str):
+        """
+        Record that a Session ID was destroyed or expired, it stays in
+        the bits until the next rebuild
+        """
+        with self._lock:
+            self._forgotten.add(session_id)
+            if self._forgotten_while_rebuilding is not None:
+                self._forgotten_while_rebuilding.add(session_id)
+
+    def record_miss(self, session_id: str):
+        """
+        Count a Session ID the filter let through but the session store
+        does not know, as a false positive unless it was forgotten
+        """
+        if session_id in self._forgotten:
+            self.stale_hits += 1
+        else:
+            self.false_positives += 1
+
+    def might_contain(self, session_id: str) -> bool:
+        """
+        Return False if session_id was certainly never added
+        """
+        self.checks += 1
+        bits, size, hashes = self._state
+        for pos in self._positions(session_id, size, hashes):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                self.rejected += 1
+                return False
+        return True
+
+    def rebuild(self, session_ids: Iterable[str]):
+        """
+        Replace the filter content with session_ids, dropping destroyed
+        Session IDs. Session IDs added while rebuilding are kept. One
+        rebuild runs at a time, so none of them is lost between two
+        overlapping rebuilds
+        """
+        with self._rebuild_lock:
+            self._rebuild(session_ids)
+
+    def _rebuild(self, session_ids: Iterable[str]):
+        """
+        Build the new bit array and swap it in, the rebuild lock must be
+        held
+        """
+        with self._lock:
+            self._rebuilding = []
+            self._forgotten_while_rebuilding = set()
+        session_ids = list(session_ids)
+        new = SessionFilter(max(self.capacity, 2 * len(session_ids)),
+                            self.fp_rate)
+        for session_id in session_ids:
+            new._add(session_id)
+        with self._lock:
+            for session_id in self._rebuilding:
+                new._add(session_id)
+            self._rebuilding = None
+            self._forgotten = self._forgotten_while_rebuilding
+            self._forgotten_while_rebuilding = None
+            self.capacity, self.size = new.capacity, new.size
+            self.hashes, self.count = new.hashes, new.count
+            self.bits = new.bits
+            self._state = new._state
+
+    def expected_fp_rate(self) -> float:
+        """
+        Return the false positive rate expected for the current fill
+        """
+        fill = 1 - math.exp(-self.hashes * self.count / self.size)
+        return fill ** self.hashes
+
+    def stats(self) -> dict:
+        """
+        Return the filter configuration and counters
+        """
+        return {
+            "capacity": self.capacity,
+            "count": self.count,
+            "bits": self.size,
+            "hashes": self.hashes,
+            "target_fp_rate": self.fp_rate,
+            "expected_fp_rate": self.expected_fp_rate(),
+            "checks": self.checks,
+            "rejected": self.rejected,
+            "false_positives": self.false_positives,
+            "stale_hits": self.stale_hits
+        }
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Define SessionSignedAuth class
+"""
+import base64
+import hashlib
+import hmac
+import os
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+from .session_auth import SessionAuth
+
+
+class SessionSignedAuth(SessionAuth):
+    """
+    Definition of class SessionSignedAuth where the Session ID is a
+    stateless signed token carrying the user id, issue time in
+    milliseconds and expiry in seconds. Tokens look like
+    <kid>.<payload>.<signature> and are authenticated with HMAC-SHA256
+    under the key named by kid
+    """
+    def __init__(self):
+        """
+        Initialize the class. SESSION_SIGNING_KEYS is a comma separated
+        list of kid:secret pairs, the first one signs new sessions and
+        all of them are accepted, which allows rotating keys. At most
+        SESSION_REVOCATION_LIMIT sessions are revoked one by one, older
+        revocations are folded into a per user cutoff
+        """
+        try:
+            duration = int(os.getenv('SESSION_DURATION'))
+        except Exception:
+            duration = 0
+        self.session_duration = duration
+        self.signing_keys = {}
+        self.active_kid = None
+        keys = os.getenv('SESSION_SIGNING_KEYS')
+        if keys:
+            for pair in reversed(keys.split(',')):
+                kid, _, secret = pair.strip().partition(':')
+                if kid and secret:
+                    self.rotate_key(kid, secret)
+        if self.active_kid is None:
+            self.rotate_key("0", base64.b64encode(os.urandom(32)).decode())
+        revocation = os.getenv('SESSION_REVOCATION', 'true')
+        self.revocation = revocation.lower() != 'false'
+        try:
+            limit = int(os.getenv('SESSION_REVOCATION_LIMIT'))
+        except Exception:
+            limit = 10000
+        self.revocation_limit = max(limit, 1)
+        self.revoked = OrderedDict()
+        self.revoked_before = {}
+
+    def rotate_key(self, kid: str, secret: str):
+        """
+        Add a signing key and make it the one used for new sessions
+        Args:
+            kid (str): key id, must not contain a dot
+            secret (str): HMAC secret
+        """
+        if '.' in kid:
+            raise ValueError("kid must not contain '.'")
+        self.signing_keys[kid] = secret.encode('utf-8')
+        self.active_kid = kid
+
+    def _sign(self, kid: str, payload: str) -> str:
+        """
+        Return the base64url HMAC-SHA256 of payload under key kid
+        """
+        digest = hmac.new(self.signing_keys[kid], payload.encode('utf-8'),
+                          hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode('utf-8').rstrip('=')
+
+    def create_session(self, user_id: str = None) -> str:
+        """
+        Creates a signed Session ID for a user with id user_id
+        Args:
+            user_id (str): user's user id
+        Return:
+            None is user_id is None or not a string
+            Session ID in string format
+        """
+        if user_id is None or not isinstance(user_id, str):
+            return None
+        if '|' in user_id:
+            return None
+        now = time.time()
+        issued_at = int(now * 1000)
+        expires_at = 0
+        if self.session_duration > 0:
+            expires_at = int(now) + self.session_duration
+        nonce = base64.urlsafe_b64encode(os.urandom(9)).decode('utf-8')
+        raw = "{}|{}|{}|{}".format(user_id, issued_at, expires_at, nonce)
+        payload = base64.urlsafe_b64encode(raw.encode('utf-8'))
+        payload = payload.decode('utf-8').rstrip('=')
+        kid = self.active_kid
+        return "{}.{}.{}".format(kid, payload, self._sign(kid, payload))
+
+    def _verify(self, session_id: str) -> Tuple[str, int, int]:
+        """
+        Check the signature and expiry of a Session ID
+        Return:
+            (user id, issue time, expiry) or (None, 0, 0) if the Session
+            ID is invalid
+        """
+        if session_id is None or not isinstance(session_id, str):
+            return None, 0, 0
+        parts = session_id.split('.')
+        if len(parts) != 3 or parts[0] not in self.signing_keys:
+            return None, 0, 0
+        kid, payload, signature = parts
+        if not hmac.compare_digest(self._sign(kid, payload), signature):
+            return None, 0, 0
+        try:
+            padded = payload + '=' * (-len(payload) % 4)
+            raw = base64.urlsafe_b64decode(padded).decode('utf-8')
+            user_id, issued_at, expires_at, _ = raw.split('|')
+            issued_at = int(issued_at)
+            expires_at = int(expires_at)
+        except Exception:
+            return None, 0, 0
+        if expires_at and expires_at < time.time():
+            return None, 0, 0
+        revoked_before = self.revoked_before.get(user_id)
+        if revoked_before is not None and issued_at < revoked_before:
+            return None, 0, 0
+        return user_id, issued_at, expires_at
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """
+        Returns a user ID based on a signed session ID
+        Args:
+            session_id (str): session ID
+        Return:
+            user id or None if session_id is invalid, expired or revoked
+        """
+        user_id, _, _ = self._verify(session_id)
+        if user_id is None:
+            return None
+        if self.revoked and session_id in self.revoked:
+            return None
+        return user_id
+
+    def destroy_session(self, request=None):
+        """
+        Revoke the signed session of a request until it expires
+        """
+        if request is None:
+            return False
+        session_id = self.session_cookie(request)
+        user_id, issued_at, expires_at = self._verify(session_id)
+        if user_id is None or session_id in self.revoked:
+            return False
+        if self.revocation:
+            self.revoked[session_id] = (user_id, issued_at, expires_at)
+            self._prune_revocations()
+        return True
+
+    def destroy_all_sessions(self, user_id: str = None) -> int:
+        """
+        Revoke every signed session of a user issued up to now
+        Args:
+            user_id (str): user's user id
+        Return:
+            always 0, signed sessions are not tracked one by one
+        """
+        if user_id is None or not isinstance(user_id, str):
+            return 0
+        self.revoked_before[user_id] = int(time.time() * 1000)
+        self._prune_revocations()
+        return 0
+
+    def _prune_revocations(self):
+        """
+        Drop the revocations of sessions that have all expired and fold
+        the oldest single revocations past SESSION_REVOCATION_LIMIT into
+        the cutoff of their user. Without SESSION_DURATION sessions never
+        expire and the cutoffs are kept, one per user at most
+        """
+        now = time.time()
+        for session_id, (_, _, expires_at) in list(self.revoked.items()):
+            if expires_at and expires_at < now:
+                del self.revoked[session_id]
+        if self.session_duration > 0:
+            horizon = (now - self.session_duration) * 1000
+            for user_id, cutoff in list(self.revoked_before.items()):
+                if cutoff < horizon:
+                    del self.revoked_before[user_id]
+        while len(self.revoked) > self.revocation_limit:
+            _, (user_id, issued_at, _) = self.revoked.popitem(last=False)
+            cutoff = self.revoked_before.get(user_id, 0)
+            self.revoked_before[user_id] = max(cutoff, issued_at + 1)
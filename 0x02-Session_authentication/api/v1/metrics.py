@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Latency histograms and counters exposed in Prometheus text format
+"""
+import os
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Dict, List
+
+
+enabled = os.getenv('METRICS', 'false').lower() == 'true'
+
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+           0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """
+    Cumulative latency histogram for one label value. Updates are plain
+    list increments without a lock, a concurrent update may rarely be
+    lost which is acceptable for monitoring
+    """
+    def __init__(self):
+        """
+        Initialize an empty histogram
+        """
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """
+        Record one observation in seconds
+        """
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+
+class Family:
+    """
+    A named group of histograms keyed by the value of one label
+    """
+    def __init__(self, name: str, help: str, label: str):
+        """
+        Initialize the family
+        """
+        self.name = name
+        self.help = help
+        self.label = label
+        self.histograms = {}
+
+    def get(self, value: str) -> Histogram:
+        """
+        Return the histogram of a label value, creating it if needed
+        """
+        histogram = self.histograms.get(value)
+        if histogram is None:
+            histogram = self.histograms.setdefault(value, Histogram())
+        return histogram
+
+    def render(self) -> List[str]:
+        """
+        Return the Prometheus text lines of the family
+        """
+        lines = ["# HELP {} {}".format(self.name, self.help),
+                 "# TYPE {} histogram".format(self.name)]
+        for value, histogram in sorted(self.histograms.items()):
+            labels = '{}="{}"'.format(self.label, value)
+            total = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                total += count
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(
+                    self.name, labels, bound, total))
+            lines.append("{}_sum{{{}}} {}".format(
+                self.name, labels, histogram.sum))
+            lines.append("{}_count{{{}}} {}".format(
+                self.name, labels, total))
+        return lines
+
+
+FAMILIES = {}
+COLLECTORS = []
+
+
+def family(name: str, help: str, label: str) -> Family:
+    """
+    Return the histogram family called name, registering it if needed
+    """
+    if name not in FAMILIES:
+        FAMILIES[name] = Family(name, help, label)
+    return FAMILIES[name]
+
+
+def register_collector(collector: Callable[[], Dict[str, float]],
+                       help: Dict[str, str] = None):
+    """
+    Register a callable returning {metric name: value} that is read
+    every time the metrics are rendered, names ending in _total are
+    counters and the others gauges
+    """
+    COLLECTORS.append((collector, help or {}))
+
+
+def timed(histogram_family: Family, stage: str) -> Callable:
+    """
+    Decorator recording the duration of every call in a histogram
+    """
+    def decorator(f):
+        histogram = histogram_family.get(stage)
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                histogram.observe(perf_counter() - start)
+        wrapper.timed = True
+        return wrapper
+    return decorator
+
+
+def instrument(cls: type, names: List[str], histogram_family: Family):
+    """
+    Wrap the methods names of cls with timed, methods missing from cls
+    or already wrapped are skipped. Nothing is wrapped when metrics are
+    disabled so there is no overhead
+    """
+    if not enabled:
+        return
+    for name in names:
+        attr = cls.__dict__.get(name)
+        func = attr.__func__ if isinstance(attr, classmethod) \
+            else getattr(cls, name, None)
+        if getattr(func, 'timed', False):
+            continue
+        if isinstance(attr, classmethod):
+            wrapped = classmethod(timed(histogram_family, name)(
+                attr.__func__))
+        elif getattr(cls, name, None) is not None:
+            wrapped = timed(histogram_family, name)(getattr(cls, name))
+        else:
+            continue
+        setattr(cls, name, wrapped)
+
+
+def render() -> str:
+    """
+    Return every metric in Prometheus text exposition format
+    """
+    lines = []
+    for histogram_family in FAMILIES.values():
+        lines.extend(histogram_family.render())
+    for collector, help in COLLECTORS:
+        for name, value in sorted(collector().items()):
+            if name in help:
+                lines.append("# HELP {} {}".format(name, help[name]))
+            kind = "counter" if name.endswith("_total") else "gauge"
+            lines.append("# TYPE {} {}".format(name, kind))
+            lines.append("{} {}".format(name, value))
+    return "\n".join(lines) + "\n"
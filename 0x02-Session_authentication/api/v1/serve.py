@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Pre-fork server for the API: the master process loads the model data
+once, freezes it out of the garbage collector and forks the workers so
+they share it copy-on-write.
+Writes to the model files are serialized between the workers by the
+.db.lock file lock and each worker reloads a file another one wrote
+before its next request or write. Periodic tasks of the auth backend
+only run in the workers.
+Sessions of session_auth, session_exp_auth and session_db_auth, and the
+revocations of session_signed_auth, live in each worker's memory, use
+basic_auth when serving with more than one worker
+"""
+import gc
+import os
+import signal
+import socket
+import time
+from os import getenv
+from typing import List
+
+
+def unique_memory(pid: int) -> int:
+    """
+    Return the memory in kB only mapped by process pid (USS), or -1 if
+    it can not be read
+    """
+    total = 0
+    try:
+        with open("/proc/{}/smaps_rollup".format(pid)) as f:
+            for line in f:
+                if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                    total += int(line.split()[1])
+    except (OSError, ValueError):
+        return -1
+    return total
+
+
+def report(pids: List[int]):
+    """
+    Print the unique memory of every worker
+    """
+    for pid in pids:
+        print("worker {}: {} kB unique".format(pid, unique_memory(pid)),
+              flush=True)
+
+
+def serve(host: str, port: int, workers: int):
+    """
+    Load the data, bind the listening socket and fork workers
+    """
+    os.environ["WARM_UP"] = "false"
+    from api.v1.auth.auth import Auth
+    Auth.background_tasks = False
+    from api.v1.app import app, load_models
+    from api.v1 import app as app_module
+    from models.base import new_epoch
+    load_models()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+    gc.collect()
+    gc.freeze()
+
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            new_epoch()
+            if app_module.auth is not None:
+                app_module.auth.after_fork()
+            from werkzeug.serving import make_server
+            server = make_server(host, port, app, threaded=True,
+                                 fd=sock.fileno())
+            server.serve_forever()
+            os._exit(0)
+        pids.append(pid)
+
+    def stop(signum, frame):
+        """
+        Forward a termination signal to the workers
+        """
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: report(pids))
+    time.sleep(1)
+    report(pids)
+    for pid in pids:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+
+
+if __name__ == "__main__":
+    host = getenv("API_HOST", "0.0.0.0")
+    port = getenv("API_PORT", "5000")
+    workers = getenv("API_WORKERS", str(os.cpu_count() or 1))
+    serve(host, int(port), int(workers))
@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
 """ DocDocDocDocDocDoc
 """
-from flask import Blueprint
+from flask import Blueprint, Response
+from models import serializer
 
 app_views = Blueprint("app_views", __name__, url_prefix="/api/v1")
 
+
+def json_response(obj, status: int = 200) -> Response:
+    """ Build a JSON response with the fast serializer
+    """
+    return Response(serializer.dumps(obj), status=status,
+                    mimetype="application/json")
+
+
 from api.v1.views.index import *
 from api.v1.views.users import *
 from api.v1.views.session_auth import *
-
-User.load_from_file()
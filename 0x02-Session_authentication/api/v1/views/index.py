@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """ Module of Index views
 """
-from flask import jsonify, abort
+from flask import Response, jsonify, abort
 from api.v1.views import app_views
 
 
@@ -41,4 +41,19 @@ def stats() -> str:
     from models.user import User
     stats = {}
     stats['users'] = User.count()
+    from api.v1.app import auth
+    session_filter = getattr(auth, 'session_filter', None)
+    if session_filter is not None:
+        stats['session_filter'] = session_filter.stats()
     return jsonify(stats)
+
+
+@app_views.route('/metrics', methods=['GET'], strict_slashes=False)
+def prometheus_metrics() -> str:
+    """ GET /api/v1/metrics
+    Return:
+      - the API metrics in Prometheus text format
+    """
+    from api.v1 import metrics
+    return Response(metrics.render(),
+                    mimetype="text/plain; version=0.0.4")
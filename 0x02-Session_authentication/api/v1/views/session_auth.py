@@ -2,8 +2,9 @@
 """ Module of Users views
 """
 import os
-from flask import jsonify, request
-from api.v1.views import app_views
+from flask import abort, jsonify, request
+from api.v1.admission import login_admission, login_throttle
+from api.v1.views import app_views, json_response
 from models.user import User
 
 
@@ -20,18 +21,31 @@ def auth_session():
         return jsonify({"error": "email missing"}), 400
     if password is None or password == '':
         return jsonify({"error": "password missing"}), 400
+    keys = ("email:" + email, "ip:{}".format(request.remote_addr))
+    if not login_throttle.allow(*keys):
+        return jsonify({"error": "too many failed logins"}), 429
     users = User.search({"email": email})
     if not users or users == []:
+        login_throttle.record_failure(*keys)
         return jsonify({"error": "no user found for this email"}), 404
-    for user in users:
-        if user.is_valid_password(password):
-            from api.v1.app import auth
-            session_id = auth.create_session(user.id)
-            resp = jsonify(user.to_json())
-            session_name = os.getenv('SESSION_NAME')
-            resp.set_cookie(session_name, session_id)
-            return resp
-    return jsonify({"error": "wrong password"}), 401
+    if not login_admission.acquire():
+        resp = jsonify({"error": "login temporarily unavailable"})
+        resp.headers["Retry-After"] = "1"
+        return resp, 503
+    try:
+        user = next((u for u in users if u.is_valid_password(password)),
+                    None)
+    finally:
+        login_admission.release()
+    if user is None:
+        login_throttle.record_failure(*keys)
+        return jsonify({"error": "wrong password"}), 401
+    from api.v1.app import auth
+    session_id = auth.create_session(user.id)
+    resp = json_response(user.to_json())
+    session_name = os.getenv('SESSION_NAME')
+    resp.set_cookie(session_name, session_id)
+    return resp
 
 
 @app_views.route('/auth_session/logout', methods=['DELETE'],
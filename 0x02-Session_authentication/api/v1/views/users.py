@@ -1,19 +1,134 @@
 #!/usr/bin/env python3
 """ Module of Users views
 """
-from api.v1.views import app_views
-from flask import abort, jsonify, request
+import gzip
+import zlib
+from urllib.parse import urlencode
+from api.v1.views import app_views, json_response
+from flask import Response, abort, jsonify, request
+from models import serializer
+from models.base import Base
 from models.user import User
 
 
+MAX_PAGE_SIZE = 1000
+GZIP_MIN_SIZE = 1024
+
+
+def _fields():
+    """ Parse the fields query parameter
+    Return:
+      - (list of field names or None, error message or None)
+    """
+    fields = request.args.get('fields')
+    if fields is None:
+        return None, None
+    fields = [field for field in fields.split(',') if field != '']
+    unknown = User.unknown_fields(fields)
+    if unknown or not fields:
+        return None, "unknown fields: {}".format(", ".join(unknown))
+    return fields, None
+
+
+def _not_modified(etag: str):
+    """ Return a 304 response if the request If-None-Match already has
+    etag, in its identity or gzip form, else None
+    """
+    if_none_match = request.if_none_match
+    if if_none_match.contains(etag) or \
+            if_none_match.contains(etag + "-gz"):
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
+    return None
+
+
+def _gzip_response(resp):
+    """ Compress a response body when the client accepts gzip, the gzip
+    form gets its own strong ETag
+    """
+    if 'gzip' not in request.headers.get('Accept-Encoding', ''):
+        return resp
+    resp.headers['Vary'] = 'Accept-Encoding'
+    if resp.is_streamed:
+        chunks = resp.response
+        compressor = zlib.compressobj(5, zlib.DEFLATED, 31)
+
+        def generate():
+            for chunk in chunks:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.flush()
+        resp.response = generate()
+    else:
+        body = resp.get_data()
+        if len(body) < GZIP_MIN_SIZE:
+            return resp
+        resp.set_data(gzip.compress(body, 5))
+    resp.headers['Content-Encoding'] = 'gzip'
+    etag, weak = resp.get_etag()
+    if etag is not None:
+        resp.set_etag(etag + "-gz", weak)
+    return resp
+
+
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (optional):
+      - limit: maximum number of users, enables pagination
+      - after: ID of the last user of the previous page
+      - stream: 1 to send one JSON user per line (NDJSON)
+      - fields: comma separated fields to return, for example id,email
     Return:
-      - list of all User objects JSON represented
+      - list of all User objects JSON represented, ordered by ID when
+        paginated, with a Link header to the next page
+      - 304 if If-None-Match has the ETag of the current collection
+      - 400 if limit is not a number between 1 and MAX_PAGE_SIZE or
+        fields has an unknown field
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    fields, error = _fields()
+    if error is not None:
+        return jsonify({'error': error}), 400
+    etag = "{}-{:08x}".format(User.collection_etag(),
+                              zlib.crc32(request.query_string))
+    resp = _not_modified(etag)
+    if resp is not None:
+        return resp
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    stream = request.args.get('stream') in ('1', 'true')
+    if limit is None and after is None and not stream:
+        all_users = [user.to_json(fields=fields) for user in User.all()]
+        resp = json_response(all_users)
+        resp.set_etag(etag)
+        return _gzip_response(resp)
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            return jsonify({'error': "limit must be between 1 and {}"
+                            .format(MAX_PAGE_SIZE)}), 400
+    users = User.page(after, limit)
+    if stream:
+        def generate():
+            for user in users:
+                yield serializer.dumps(user.to_json(fields=fields)) + b"\n"
+        resp = Response(generate(), mimetype="application/x-ndjson")
+    else:
+        resp = json_response([user.to_json(fields=fields)
+                              for user in users])
+    resp.set_etag(etag)
+    if limit is not None and len(users) == limit:
+        args = request.args.to_dict(flat=False)
+        args['limit'] = [limit]
+        args['after'] = [users[-1].id]
+        resp.headers['Link'] = '<{}?{}>; rel="next"'.format(
+            request.base_url, urlencode(args, doseq=True))
+    return _gzip_response(resp)
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -21,8 +136,12 @@ def view_one_user(user_id: str = None) -> str:
     """ GET /api/v1/users/:id
     Path parameter:
       - User ID
+    Query parameter (optional):
+      - fields: comma separated fields to return, for example id,email
     Return:
-      - User object JSON represented
+      - User object JSON represented, with its ETag
+      - 304 if If-None-Match has the current ETag
+      - 400 if fields has an unknown field
       - 404 if the User ID doesn't exist
     """
     if user_id is None:
@@ -31,13 +150,24 @@ def view_one_user(user_id: str = None) -> str:
         if request.current_user is None:
             abort(404)
         user = request.current_user
-        return jsonify(user.to_json())
-    user = User.get(user_id)
-    if user is None:
-        abort(404)
-    if request.current_user is None:
-        abort(404)
-    return jsonify(user.to_json())
+    else:
+        user = User.get(user_id)
+        if user is None:
+            abort(404)
+        if request.current_user is None:
+            abort(404)
+    fields, error = _fields()
+    if error is not None:
+        return jsonify({'error': error}), 400
+    etag = user.etag()
+    if fields is not None:
+        etag += "-{:08x}".format(zlib.crc32(",".join(fields).encode()))
+    resp = _not_modified(etag)
+    if resp is not None:
+        return resp
+    resp = json_response(user.to_json(fields=fields))
+    resp.set_etag(etag)
+    return resp
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'], strict_slashes=False)
@@ -54,10 +184,35 @@ def delete_user(user_id: str = None) -> str:
     user = User.get(user_id)
     if user is None:
         abort(404)
+    from api.v1.app import auth
+    if auth is not None:
+        auth.destroy_all_sessions(user.id)
     user.remove()
     return jsonify({}), 200
 
 
+@app_views.route('/users/<user_id>/sessions', methods=['DELETE'],
+                 strict_slashes=False)
+def delete_user_sessions(user_id: str = None) -> str:
+    """ DELETE /api/v1/users/:id/sessions
+    Path parameter:
+      - User ID
+    Return:
+      - JSON with the number of revoked sessions
+      - 404 if the User ID doesn't exist
+    """
+    if user_id is None:
+        abort(404)
+    user = User.get(user_id)
+    if user is None:
+        abort(404)
+    from api.v1.app import auth
+    revoked = 0
+    if auth is not None:
+        revoked = auth.destroy_all_sessions(user.id)
+    return jsonify({"revoked": revoked}), 200
+
+
 @app_views.route('/users', methods=['POST'], strict_slashes=False)
 def create_user() -> str:
     """ POST /api/v1/users/
@@ -90,7 +245,7 @@ def create_user() -> str:
             user.first_name = rj.get("first_name")
             user.last_name = rj.get("last_name")
             user.save()
-            return jsonify(user.to_json()), 201
+            return json_response(user.to_json(), 201)
         except Exception as e:
             error_msg = "Can't create User: {}".format(e)
     return jsonify({'error': error_msg}), 400
@@ -126,4 +281,95 @@ def update_user(user_id: str = None) -> str:
     if rj.get('last_name') is not None:
         user.last_name = rj.get('last_name')
     user.save()
-    return jsonify(user.to_json()), 200
+    return json_response(user.to_json())
+
+
+MAX_BULK_SIZE = 10000
+
+
+def _bulk_error(op: dict) -> str:
+    """ Validate one bulk operation before any of them is applied
+    Return:
+      - the error message, or None if the operation is valid
+    """
+    if not isinstance(op, dict):
+        return "Wrong format"
+    kind = op.get('op')
+    if kind not in ('create', 'update', 'delete'):
+        return "op must be create, update or delete"
+    if kind == 'create':
+        if not isinstance(op.get('email'), str) or op.get('email') == "":
+            return "email missing"
+        if not isinstance(op.get('password'), str) or \
+                op.get('password') == "":
+            return "password missing"
+    elif not isinstance(op.get('id'), str) or op.get('id') == "":
+        return "id missing"
+    if kind != 'delete':
+        for name in ('first_name', 'last_name'):
+            if not isinstance(op.get(name), (str, type(None))):
+                return "{} must be a string".format(name)
+    return None
+
+
+def _bulk_item(op: dict, auth) -> dict:
+    """ Apply one bulk operation, validated by _bulk_error, in memory
+    Return:
+      - dictionary with the status code and the User or the error
+    """
+    kind = op.get('op')
+    if kind == 'create':
+        user = User()
+        user.email = op.get('email')
+        user.password = op.get('password')
+        user.first_name = op.get('first_name')
+        user.last_name = op.get('last_name')
+        user.save()
+        return {'status': 201, 'user': user.to_json()}
+    user = User.get(op.get('id'))
+    if user is None:
+        return {'status': 404, 'error': "Not found"}
+    if kind == 'delete':
+        if auth is not None:
+            auth.destroy_all_sessions(user.id)
+        user.remove()
+        return {'status': 200, 'id': user.id}
+    if op.get('first_name') is not None:
+        user.first_name = op.get('first_name')
+    if op.get('last_name') is not None:
+        user.last_name = op.get('last_name')
+    user.save()
+    return {'status': 200, 'user': user.to_json()}
+
+
+@app_views.route('/users/bulk', methods=['POST'], strict_slashes=False)
+def bulk_users() -> str:
+    """ POST /api/v1/users/bulk
+    JSON body:
+      - list of operations, each one of:
+        - {"op": "create", "email", "password", "first_name",
+          "last_name"}
+        - {"op": "update", "id", "first_name", "last_name"}
+        - {"op": "delete", "id"}
+    Return:
+      - list of per operation results in request order, every change is
+        written to file once. Invalid operations get a 400 result and
+        are skipped, all of them are validated before any is applied
+      - 400 if the body is not a list of at most MAX_BULK_SIZE operations
+    """
+    try:
+        rj = request.get_json()
+    except Exception:
+        rj = None
+    if not isinstance(rj, list):
+        return jsonify({'error': "Wrong format"}), 400
+    if len(rj) > MAX_BULK_SIZE:
+        return jsonify({'error': "at most {} operations"
+                        .format(MAX_BULK_SIZE)}), 400
+    from api.v1.app import auth
+    errors = [_bulk_error(op) for op in rj]
+    with Base.batch():
+        results = [_bulk_item(op, auth) if error is None
+                   else {'status': 400, 'error': error}
+                   for op, error in zip(rj, errors)]
+    return json_response(results)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+""" Benchmark JSON serialization of the user list and of file persistence
+Usage: ./bench_serialization.py [number of users]
+"""
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+from models import serializer
+from models.base import DATA
+from models.user import User
+
+
+def timed(f) -> float:
+    """ Return the duration of f() in seconds
+    """
+    start = perf_counter()
+    f()
+    return perf_counter() - start
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    os.chdir(tempfile.mkdtemp())
+    User.load_from_file()
+    for i in range(users):
+        user = User(email="user{}@hbtn.io".format(i), first_name="Bob")
+        user.password = "pwd"
+        DATA["User"][user.id] = user
+    backends = [("stdlib", None)]
+    if serializer.orjson is not None:
+        backends.append(("orjson", serializer.orjson))
+    for name, backend in backends:
+        serializer.orjson = backend
+        to_json = timed(lambda: [u.to_json() for u in User.all()])
+        payload = [u.to_json() for u in User.all()]
+        dumps = timed(lambda: serializer.dumps(payload))
+        save = timed(User.save_to_file)
+        load = timed(User.load_from_file)
+        print("{} users, {}: to_json {:.3f}s, list body {:.3f}s, "
+              "save_to_file {:.3f}s, load_from_file {:.3f}s".format(
+                  users, name, to_json, dumps, save, load))
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+""" Benchmark session lookup for every session based AUTH_TYPE
+Usage: ./bench_sessions.py [number of sessions] [number of lookups]
+"""
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.session_db_auth import SessionDBAuth
+from api.v1.auth.session_signed_auth import SessionSignedAuth
+
+
+def bench(auth, sessions: int, lookups: int) -> float:
+    """ Return the mean lookup time in microseconds
+    """
+    session_ids = [auth.create_session("user-{}".format(i))
+                   for i in range(sessions)]
+    start = perf_counter()
+    for i in range(lookups):
+        auth.user_id_for_session_id(session_ids[i % sessions])
+    return (perf_counter() - start) / lookups * 1e6
+
+
+if __name__ == "__main__":
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    os.chdir(tempfile.mkdtemp())
+    for auth_class in (SessionAuth, SessionDBAuth, SessionSignedAuth):
+        auth_class.user_id_by_session_id = {}
+        auth = auth_class()
+        auth.load_data()
+        mean = bench(auth, sessions, lookups)
+        print("{}: {:.2f} us/lookup".format(auth_class.__name__, mean))
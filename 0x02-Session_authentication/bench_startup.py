@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+""" Benchmark API startup against the size of the user file
+Usage: ./bench_startup.py [number of users]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+
+PROBE = """
+from time import perf_counter
+start = perf_counter()
+from api.v1.app import app
+imported = perf_counter()
+client = app.test_client()
+client.get('/api/v1/status')
+status = perf_counter()
+client.get('/api/v1/stats')
+stats = perf_counter()
+print("import: {:.3f}s, first /status: {:.3f}s, first /stats: {:.3f}s"
+      .format(imported - start, status - imported, stats - status))
+"""
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workdir = tempfile.mkdtemp()
+    objs = {}
+    for i in range(users):
+        obj_id = "user-{}".format(i)
+        objs[obj_id] = {
+            "id": obj_id,
+            "created_at": "2022-01-13T19:42:16",
+            "updated_at": "2022-01-13T19:42:16",
+            "email": "user{}@hbtn.io".format(i),
+            "_password": "0" * 64,
+            "first_name": None,
+            "last_name": None
+        }
+    with open(os.path.join(workdir, ".db_User.json"), 'w') as f:
+        json.dump(objs, f)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.dirname(os.path.abspath(__file__))
+    for warm_up in ("false", "true"):
+        env["WARM_UP"] = warm_up
+        print("{} users, WARM_UP={}".format(users, warm_up))
+        subprocess.run([sys.executable, "-c", PROBE], cwd=workdir, env=env,
+                       check=True)
@@ -1,20 +1,120 @@
 #!/usr/bin/env python3
 """ Base module
 """
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
 from datetime import datetime
 from typing import TypeVar, List, Iterable
 from os import path
-import json
+from models import serializer
+import fcntl
+import os
+import threading
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+ORDER = {}
+UNIT_OF_WORK = threading.local()
+VERSIONS = {}
+EPOCH = uuid.uuid4().hex[:8]
+LOADED = {}
+STAMPS = {}
+
+
+class StoreLock():
+    """ Reentrant lock serializing the writes of the model files between
+    the threads of a process and, with flock on a lock file, between the
+    processes sharing the files (pre-forked workers, scripts)
+    """
+
+    def __init__(self, file_path: str):
+        """ Initialize a StoreLock on file_path
+        """
+        self.file_path = file_path
+        self.thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        """ Take the thread lock, and the file lock if not already held
+        """
+        self.thread_lock.acquire()
+        if self._depth == 0:
+            # opened on every acquisition: a descriptor inherited through
+            # fork would share its flock with the other processes
+            try:
+                self._file = open(self.file_path, 'a')
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self.thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *args):
+        """ Release the lock, and the file lock with the outermost hold
+        """
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self.thread_lock.release()
+
+
+STORE_LOCK = StoreLock(".db.lock")
+
+
+def _stamp(file_path: str):
+    """ Return what identifies the content of a file: its inode, size
+    and modification time, or None if it does not exist
+    """
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def new_epoch():
+    """ Start a new ETag epoch, called in each forked worker since the
+    VERSIONS of the workers diverge after fork
+    """
+    global EPOCH
+    EPOCH = uuid.uuid4().hex[:8]
+
+
+def _unit_of_work():
+    """ Return the open batches and the classes waiting to be saved of
+    the calling thread, a batch only defers writes made by its thread
+    """
+    if not hasattr(UNIT_OF_WORK, 'batches'):
+        UNIT_OF_WORK.batches = {}
+        UNIT_OF_WORK.dirty = {}
+    return UNIT_OF_WORK.batches, UNIT_OF_WORK.dirty
+
+
+def format_timestamp(value: datetime) -> str:
+    """ Format a datetime with TIMESTAMP_FORMAT
+    """
+    return value.isoformat(timespec='seconds')
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ Parse a string written with TIMESTAMP_FORMAT
+    """
+    return datetime.fromisoformat(value)
 
 
 class Base():
     """ Base class
     """
+    FIELDS = ("id", "created_at", "updated_at")
 
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
@@ -23,17 +123,19 @@ class Base():
         if DATA.get(s_class) is None:
             DATA[s_class] = {}
 
-        self.id = kwargs.get('id', str(uuid.uuid4()))
+        if 'id' in kwargs:
+            self.id = kwargs['id']
+        else:
+            self.id = str(uuid.uuid4())
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = parse_timestamp(kwargs.get('created_at'))
         else:
             self.created_at = datetime.utcnow()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = parse_timestamp(kwargs.get('updated_at'))
         else:
             self.updated_at = datetime.utcnow()
+        self._version = kwargs.get('_version', 0)
 
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Equality
@@ -44,15 +146,47 @@ class Base():
             return False
         return (self.id == other.id)
 
-    def to_json(self, for_serialization: bool = False) -> dict:
-        """ Convert the object a JSON dictionary
+    def etag(self) -> str:
+        """ Strong entity tag of the object, changed by every save
+        """
+        return "{}-{}".format(self.id, self._version)
+
+    @classmethod
+    def unknown_fields(cls, fields: List[str]) -> List[str]:
+        """ Return the names of fields that are not public fields of
+        the class
+        """
+        return [field for field in fields if field not in cls.FIELDS]
+
+    @classmethod
+    def collection_etag(cls) -> str:
+        """ Strong entity tag of all objects of the class, changed by
+        every save, remove or load
         """
+        s_class = cls.__name__
+        return "{}-{}-{}".format(s_class, EPOCH, VERSIONS.get(s_class, 0))
+
+    def to_json(self, for_serialization: bool = False,
+                fields: List[str] = None) -> dict:
+        """ Convert the object a JSON dictionary, limited to fields when
+        given
+        """
+        if fields is not None:
+            result = {}
+            attributes = self.__dict__
+            for key in fields:
+                if key in attributes and key[0] != '_':
+                    value = attributes[key]
+                    if type(value) is datetime:
+                        value = format_timestamp(value)
+                    result[key] = value
+            return result
         result = {}
         for key, value in self.__dict__.items():
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
+                result[key] = format_timestamp(value)
             else:
                 result[key] = value
         return result
@@ -63,43 +197,124 @@ class Base():
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
+        with STORE_LOCK:
+            LOADED[s_class] = cls
+            objs = {}
+            STAMPS[s_class] = _stamp(file_path)
+            if path.exists(file_path):
+                with open(file_path, 'rb') as f:
+                    objs_json = serializer.loads(f.read())
+                    for obj_id, obj_json in objs_json.items():
+                        objs[obj_id] = cls(**obj_json)
+            DATA[s_class] = objs
+            ORDER.pop(s_class, None)
+            VERSIONS[s_class] = VERSIONS.get(s_class, 0) + 1
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+    @classmethod
+    def sync(cls):
+        """ Reload the objects of the class, or of every loaded class when
+        called on Base, whose file was written by another process since
+        this one last read or wrote it
+        """
+        classes = list(LOADED.values()) if cls is Base else [cls]
+        for model in classes:
+            s_class = model.__name__
+            file_path = ".db_{}.json".format(s_class)
+            if _stamp(file_path) == STAMPS.get(s_class):
+                continue
+            with STORE_LOCK:
+                if _stamp(file_path) != STAMPS.get(s_class):
+                    model.load_from_file()
 
     @classmethod
     def save_to_file(cls):
-        """ Save all objects to file
+        """ Save all objects to file, or only mark them to be saved when
+        a batch is open in the calling thread
         """
         s_class = cls.__name__
+        VERSIONS[s_class] = VERSIONS.get(s_class, 0) + 1
+        batches, dirty = _unit_of_work()
+        if s_class in batches or 'Base' in batches:
+            dirty[s_class] = cls
+            return
         file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        with STORE_LOCK:
+            objs_json = {}
+            for obj_id, obj in DATA[s_class].items():
+                objs_json[obj_id] = obj.to_json(True)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+            with open(file_path + ".tmp", 'wb') as f:
+                f.write(serializer.dumps(objs_json))
+            os.replace(file_path + ".tmp", file_path)
+            STAMPS[s_class] = _stamp(file_path)
+
+    @classmethod
+    @contextmanager
+    def batch(cls):
+        """ Unit of work: inside the block save, remove and save_to_file
+        only change memory, each modified class is written to file once
+        when the outermost block exits. Base.batch() covers every class.
+        Only writes made by the thread that opened the block are deferred,
+        the store lock is held until the block exits. When the block
+        raises nothing is written and the modified classes are reloaded
+        from file instead
+        """
+        s_class = cls.__name__
+        batches, dirty = _unit_of_work()
+        with STORE_LOCK:
+            batches[s_class] = batches.get(s_class, 0) + 1
+            failed = False
+            try:
+                yield
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                batches[s_class] -= 1
+                if batches[s_class] == 0:
+                    del batches[s_class]
+                    for name, dirty_cls in list(dirty.items()):
+                        if s_class not in ('Base', name):
+                            continue
+                        if name in batches or 'Base' in batches:
+                            continue
+                        del dirty[name]
+                        if failed:
+                            dirty_cls.load_from_file()
+                        else:
+                            dirty_cls.save_to_file()
 
     def save(self):
-        """ Save current object
+        """ Save current object, on top of the objects other processes
+        saved to file
         """
         s_class = self.__class__.__name__
-        self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        with STORE_LOCK:
+            self.__class__.sync()
+            current = DATA[s_class].get(self.id)
+            if current is not None and current is not self:
+                self._version = max(self._version, current._version)
+            self.updated_at = datetime.utcnow()
+            self._version += 1
+            if s_class in ORDER and self.id not in DATA[s_class]:
+                insort(ORDER[s_class], self.id)
+            DATA[s_class][self.id] = self
+            self.__class__.save_to_file()
 
     def remove(self):
         """ Remove object
         """
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        with STORE_LOCK:
+            self.__class__.sync()
+            if DATA[s_class].get(self.id) is not None:
+                del DATA[s_class][self.id]
+                ids = ORDER.get(s_class)
+                if ids is not None:
+                    i = bisect_left(ids, self.id)
+                    if i < len(ids) and ids[i] == self.id:
+                        del ids[i]
+                self.__class__.save_to_file()
 
     @classmethod
     def count(cls) -> int:
@@ -114,6 +329,23 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def page(cls, after: str = None,
+             limit: int = None) -> List[TypeVar('Base')]:
+        """ Return up to limit objects ordered by ID, starting after the
+        ID after. The sorted IDs are kept up to date by save and remove
+        and rebuilt if the objects were changed some other way
+        """
+        s_class = cls.__name__
+        objs = DATA[s_class]
+        ids = ORDER.get(s_class)
+        if ids is None or len(ids) != len(objs):
+            ids = ORDER[s_class] = sorted(objs)
+        start = 0 if after is None else bisect_right(ids, after)
+        end = len(ids) if limit is None else start + limit
+        return [objs[obj_id] for obj_id in ids[start:end]
+                if obj_id in objs]
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
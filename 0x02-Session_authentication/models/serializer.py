@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+""" Serializer module: JSON encoding used for API responses and
+persistence, backed by orjson when it is installed and by the standard
+library json module otherwise. Set JSON_BACKEND=stdlib to force the
+standard library
+"""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if os.getenv('JSON_BACKEND', '').lower() == 'stdlib':
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "stdlib"
+
+
+def dumps(obj) -> bytes:
+    """ Encode obj, made of dicts, lists, strings, numbers and None, to
+    UTF-8 JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data: bytes):
+    """ Decode UTF-8 JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
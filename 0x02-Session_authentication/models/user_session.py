@@ -1,13 +1,45 @@
 #!/usr/bin/env python3
 """ UserSession module
 """
-from models.base import Base
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Iterable, List, TypeVar
+
+from models.base import Base, DATA, STORE_LOCK, parse_timestamp
+
+
+SESSION_INDEX = {}
+USER_INDEX = {}
+CREATED_INDEX = []
+
+
+def _index(obj: TypeVar('UserSession'), session_index: dict = None,
+           user_index: dict = None):
+    """ Add a session to the session_id and user_id indexes
+    """
+    if session_index is None:
+        session_index, user_index = SESSION_INDEX, USER_INDEX
+    session_index[obj.session_id] = obj.id
+    user_index.setdefault(obj.user_id, set()).add(obj.id)
+
+
+def _unindex(obj: TypeVar('UserSession')):
+    """ Drop a session from the session_id and user_id indexes
+    """
+    if SESSION_INDEX.get(obj.session_id) == obj.id:
+        del SESSION_INDEX[obj.session_id]
+    obj_ids = USER_INDEX.get(obj.user_id)
+    if obj_ids is not None:
+        obj_ids.discard(obj.id)
+        if not obj_ids:
+            del USER_INDEX[obj.user_id]
 
 
 class UserSession(Base):
     """
     UserSession class
     """
+    FIELDS = Base.FIELDS + ("user_id", "session_id", "last_seen")
 
     def __init__(self, *args: list, **kwargs: dict):
         """
@@ -16,3 +48,139 @@ class UserSession(Base):
         super().__init__(*args, **kwargs)
         self.user_id = kwargs.get('user_id')
         self.session_id = kwargs.get('session_id')
+        self.last_seen = None
+        if kwargs.get('last_seen') is not None:
+            self.last_seen = parse_timestamp(kwargs.get('last_seen'))
+
+    @classmethod
+    def load_from_file(cls):
+        """ Load all sessions from file and rebuild the indexes. They are
+        built aside and swapped in, a reload after another process wrote
+        the file runs while request threads read them
+        """
+        global SESSION_INDEX, USER_INDEX, CREATED_INDEX
+        with STORE_LOCK:
+            super().load_from_file()
+            session_index = {}
+            user_index = {}
+            created_index = []
+            for obj in DATA[cls.__name__].values():
+                _index(obj, session_index, user_index)
+                created_index.append((obj.created_at, obj.id))
+            created_index.sort()
+            SESSION_INDEX = session_index
+            USER_INDEX = user_index
+            CREATED_INDEX = created_index
+
+    @classmethod
+    def save_to_file(cls):
+        """ Save all sessions to file, the purge timer and request
+        threads change them concurrently
+        """
+        with STORE_LOCK:
+            super().save_to_file()
+
+    def save(self):
+        """ Save current session and index it by session_id, user_id and
+        created_at
+        """
+        with STORE_LOCK:
+            self.__class__.sync()
+            is_new = DATA[self.__class__.__name__].get(self.id) is None
+            super().save()
+            _index(self)
+            if is_new:
+                insort(CREATED_INDEX, (self.created_at, self.id))
+
+    def _unindex_created(self):
+        """ Drop current session from the created_at index
+        """
+        key = (self.created_at, self.id)
+        i = bisect_left(CREATED_INDEX, key)
+        if i < len(CREATED_INDEX) and CREATED_INDEX[i] == key:
+            del CREATED_INDEX[i]
+
+    def remove(self):
+        """ Remove current session and drop it from the indexes
+        """
+        with STORE_LOCK:
+            self.__class__.sync()
+            _unindex(self)
+            self._unindex_created()
+            super().remove()
+
+    @classmethod
+    def get_by_session_id(cls,
+                          session_id: str) -> TypeVar('UserSession'):
+        """ Return the session matching session_id without a full scan
+        """
+        obj_id = SESSION_INDEX.get(session_id)
+        if obj_id is None:
+            return None
+        return DATA.get(cls.__name__, {}).get(obj_id)
+
+    @classmethod
+    def session_ids(cls) -> Iterable[str]:
+        """ Return the Session IDs of every indexed session
+        """
+        return SESSION_INDEX.keys()
+
+    @classmethod
+    def search_by_user_id(cls, user_id: str) -> List[TypeVar('UserSession')]:
+        """ Return every session of user_id without a full scan
+        """
+        objs = DATA.get(cls.__name__, {})
+        return [objs[obj_id] for obj_id in USER_INDEX.get(user_id, ())
+                if obj_id in objs]
+
+    @classmethod
+    def remove_by_user_id(cls, user_id: str) -> List[str]:
+        """ Remove every session of user_id and persist once
+        Return:
+            list of the removed session IDs
+        """
+        s_class = cls.__name__
+        removed = []
+        with STORE_LOCK:
+            cls.sync()
+            for obj in cls.search_by_user_id(user_id):
+                _unindex(obj)
+                obj._unindex_created()
+                del DATA[s_class][obj.id]
+                removed.append(obj.session_id)
+            if removed:
+                cls.save_to_file()
+        return removed
+
+    @classmethod
+    def purge_expired(cls, duration: int) -> List[str]:
+        """ Remove every session whose created_at, or last_seen when it
+        was refreshed, is older than duration seconds and persist once
+        Return:
+            list of the purged session IDs
+        """
+        if duration <= 0:
+            return []
+        s_class = cls.__name__
+        cutoff = datetime.utcnow() - timedelta(seconds=duration)
+        with STORE_LOCK:
+            cls.sync()
+            end = bisect_left(CREATED_INDEX, (cutoff, ""))
+            if end == 0:
+                return []
+            purged = []
+            kept = []
+            for key in CREATED_INDEX[:end]:
+                obj = DATA[s_class].get(key[1])
+                if obj is None:
+                    continue
+                if obj.last_seen is not None and obj.last_seen >= cutoff:
+                    kept.append(key)
+                    continue
+                del DATA[s_class][key[1]]
+                _unindex(obj)
+                purged.append(obj.session_id)
+            CREATED_INDEX[:end] = kept
+            if purged:
+                cls.save_to_file()
+        return purged
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+""" Purge expired UserSession records
+Usage: SESSION_DURATION=60 ./purge_sessions.py
+"""
+import os
+from time import perf_counter
+
+from models.user_session import UserSession
+
+
+if __name__ == "__main__":
+    try:
+        duration = int(os.getenv('SESSION_DURATION'))
+    except Exception:
+        duration = 0
+    UserSession.load_from_file()
+    start = perf_counter()
+    purged = UserSession.purge_expired(duration)
+    elapsed = perf_counter() - start
+    print("Purged {} expired sessions in {:.3f}s".format(
+        len(purged), elapsed))
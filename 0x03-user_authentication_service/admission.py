@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Admission control and failure throttling for password verification
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import env
+
+
+class AdmissionController:
+    """
+    Bounds how many password verifications run at once. Callers over the
+    limit wait in a short queue until a deadline, callers that find the
+    queue full or miss the deadline are shed
+    """
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        """
+        Initialize the controller
+        Args:
+            limit (int): verifications allowed to run concurrently
+            queue_size (int): callers allowed to wait for a slot
+            timeout (float): seconds a caller waits before being shed
+        """
+        self.limit = max(limit, 1)
+        self.queue_size = max(queue_size, 0)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+
+    def acquire(self) -> bool:
+        """
+        Take a verification slot
+        Return:
+            True if the caller may verify, False if it was shed
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self.waiting >= self.queue_size:
+                    self.shed += 1
+                    return False
+                self.waiting += 1
+            acquired = self._slots.acquire(timeout=self.timeout)
+            with self._lock:
+                self.waiting -= 1
+                if not acquired:
+                    self.shed += 1
+                    return False
+        with self._lock:
+            self.in_flight += 1
+            self.admitted += 1
+        return True
+
+    def release(self):
+        """
+        Give back a slot taken by acquire
+        """
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        """
+        Return the controller gauges and counters
+        """
+        return {
+            "login_verify_limit": self.limit,
+            "login_verify_in_flight": self.in_flight,
+            "login_verify_queue_depth": self.waiting,
+            "login_verify_admitted_total": self.admitted,
+            "login_verify_shed_total": self.shed
+        }
+
+
+class FailureThrottle:
+    """
+    Token bucket per key (email or client address) that is drained by
+    failed logins. A key with an empty bucket is throttled until a token
+    is refilled. At most max_keys buckets are kept, the least recently
+    failed ones are dropped first
+    """
+    def __init__(self, burst: int, refill: float, max_keys: int = 100000):
+        """
+        Initialize the throttle
+        Args:
+            burst (int): failures allowed in a row
+            refill (float): seconds to earn back one failure
+            max_keys (int): buckets kept before the least recently
+                failed ones are dropped
+        """
+        self.burst = max(burst, 1)
+        self.refill = refill
+        self.max_keys = max(max_keys, 1)
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def _tokens(self, key: str, now: float) -> float:
+        """
+        Return the refilled token count of a key
+        """
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return float(self.burst)
+        tokens, updated_at = bucket
+        if self.refill > 0:
+            tokens += (now - updated_at) / self.refill
+        return min(tokens, float(self.burst))
+
+    def allow(self, *keys: str) -> bool:
+        """
+        Return False if any of keys has no failure left
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                if key is not None and self._tokens(key, now) < 1:
+                    self.throttled += 1
+                    return False
+        return True
+
+    def record_failure(self, *keys: str):
+        """
+        Take one token from the bucket of every key
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                if key is not None:
+                    tokens = self._tokens(key, now)
+                    self._buckets[key] = (max(tokens - 1, 0.0), now)
+                    self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Return the throttle counters
+        """
+        return {
+            "login_throttle_keys": len(self._buckets),
+            "login_throttled_total": self.throttled
+        }
+
+
+_limit = env('LOGIN_CONCURRENCY', os.cpu_count() or 1, int)
+login_admission = AdmissionController(
+    _limit,
+    env('LOGIN_QUEUE_SIZE', 2 * _limit, int),
+    env('LOGIN_QUEUE_TIMEOUT', 0.1, float))
+login_throttle = FailureThrottle(
+    env('LOGIN_FAILURE_BURST', 5, int),
+    env('LOGIN_FAILURE_REFILL', 60.0, float))
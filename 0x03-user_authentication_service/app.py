@@ -3,13 +3,24 @@
 Flask class
 """
 
+from admission import login_admission, login_throttle
 from auth import Auth
+from concurrent.futures import TimeoutError
 from flask import Flask, jsonify, request, redirect, abort
+from hasher import hasher
 
 AUTH = Auth()
 app = Flask(__name__)
 
 
+@app.teardown_appcontext
+def release_db(exception) -> None:
+    """
+    Return the request thread's database session to the pool
+    """
+    AUTH.release()
+
+
 @app.route('/', methods=['GET'], strict_slashes=False)
 def index() -> str:
     """
@@ -35,6 +46,8 @@ def users() -> str:
         return jsonify({'email': email, 'message': 'user created'})
     except ValueError:
         return jsonify({'message': 'email already registered'}), 400
+    except TimeoutError:
+        abort(503)
 
 
 @app.route('/sessions', methods=['POST'], strict_slashes=False)
@@ -50,7 +63,19 @@ def login() -> str:
     email = request.form.get('email')
     password = request.form.get('password')
 
-    if not AUTH.valid_login(email, password):
+    keys = ("email:{}".format(email), "ip:{}".format(request.remote_addr))
+    if not login_throttle.allow(*keys):
+        abort(429)
+    if not login_admission.acquire():
+        abort(503)
+    try:
+        valid = AUTH.valid_login(email, password)
+    except TimeoutError:
+        abort(503)
+    finally:
+        login_admission.release()
+    if not valid:
+        login_throttle.record_failure(*keys)
         abort(401)
 
     session_id = AUTH.create_session(email)
@@ -67,7 +92,7 @@ def logout() -> str:
     session_id = request.cookies.get('session_id')
     user = AUTH.get_user_from_session_id(session_id)
     if user:
-        AUTH.destroy_session(user.id)
+        AUTH.destroy_session(user.id, session_id)
         response = jsonify({'message': 'logout successful'})
         response.delete_cookie('session_id')
         return redirect('/', code=302)
@@ -114,6 +139,22 @@ def update_password() -> str:
         return jsonify({'email': email, 'message': 'Password updated'}), 200
     except ValueError:
         abort(403)
+    except TimeoutError:
+        abort(503)
+
+
+@app.route('/metrics', methods=['GET'], strict_slashes=False)
+def metrics() -> str:
+    """
+    Return login admission, throttling, hashing and session cache
+    metrics
+    """
+    stats = {}
+    stats.update(login_admission.stats())
+    stats.update(login_throttle.stats())
+    stats.update(hasher.stats())
+    stats.update(AUTH.session_cache_stats())
+    return jsonify(stats)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Async (ASGI) variant of app.py on Quart, with the same routes, responses
+and cookies. Serve it with: hypercorn async_app:app
+"""
+import asyncio
+
+from admission import login_throttle
+from async_auth import AsyncAuth
+from hasher import hasher
+from quart import Quart, jsonify, request, redirect, abort
+
+AUTH = AsyncAuth()
+app = Quart(__name__)
+
+
+@app.before_serving
+async def startup() -> None:
+    """
+    Create the missing tables before accepting connections
+    """
+    await AUTH.setup()
+
+
+@app.after_serving
+async def shutdown() -> None:
+    """
+    Close the database connections
+    """
+    await AUTH.close()
+
+
+@app.route('/', methods=['GET'], strict_slashes=False)
+async def index() -> str:
+    """
+    Return json response {"message": "Bienvenue"}
+    """
+    return jsonify({'message': 'Bienvenue'})
+
+
+@app.route('/users', methods=['POST'], strict_slashes=False)
+async def users() -> str:
+    """
+    Register new users with email and password
+    """
+    form = await request.form
+    email = form.get('email')
+    password = form.get('password')
+    try:
+        await AUTH.register_user(email, password)
+        return jsonify({'email': email, 'message': 'user created'})
+    except ValueError:
+        return jsonify({'message': 'email already registered'}), 400
+    except asyncio.TimeoutError:
+        abort(503)
+
+
+@app.route('/sessions', methods=['POST'], strict_slashes=False)
+async def login() -> str:
+    """
+    Log in users with email and password. Concurrent verifications are
+    bounded by the hasher pool, which queues them off the event loop
+    """
+    form = await request.form
+    email = form.get('email')
+    password = form.get('password')
+
+    keys = ("email:{}".format(email), "ip:{}".format(request.remote_addr))
+    if not login_throttle.allow(*keys):
+        abort(429)
+    try:
+        valid = await AUTH.valid_login(email, password)
+    except asyncio.TimeoutError:
+        abort(503)
+    if not valid:
+        login_throttle.record_failure(*keys)
+        abort(401)
+
+    session_id = await AUTH.create_session(email)
+    response = jsonify({'email': f'{email}', 'message': 'logged in'})
+    response.set_cookie('session_id', session_id)
+    return response
+
+
+@app.route('/sessions', methods=['DELETE'], strict_slashes=False)
+async def logout() -> str:
+    """
+    Log out users and delete session
+    """
+    session_id = request.cookies.get('session_id')
+    user = await AUTH.get_user_from_session_id(session_id)
+    if user:
+        await AUTH.destroy_session(user.id, session_id)
+        return redirect('/', code=302)
+    else:
+        abort(403)
+
+
+@app.route('/profile', methods=['GET'], strict_slashes=False)
+async def profile() -> str:
+    """
+    Return user profile information
+    """
+    session_id = request.cookies.get('session_id')
+    user = await AUTH.get_user_from_session_id(session_id)
+    if user:
+        return jsonify({'email': user.email}), 200
+    else:
+        abort(403)
+
+
+@app.route('/reset_password', methods=['POST'], strict_slashes=False)
+async def get_reset_password_token() -> str:
+    """
+    Request password reset token for user
+    """
+    email = (await request.form).get('email')
+    try:
+        reset_token = await AUTH.get_reset_password_token(email)
+        return jsonify({'email': email, 'reset_token': reset_token}), 200
+    except ValueError:
+        abort(403)
+
+
+@app.route('/reset_password', methods=['PUT'], strict_slashes=False)
+async def update_password() -> str:
+    """
+    Update user's password using reset token
+    """
+    form = await request.form
+    email = form.get('email')
+    reset_token = form.get('reset_token')
+    new_password = form.get('new_password')
+    try:
+        await AUTH.update_password(reset_token, new_password)
+        return jsonify({'email': email, 'message': 'Password updated'}), 200
+    except ValueError:
+        abort(403)
+    except asyncio.TimeoutError:
+        abort(503)
+
+
+@app.route('/metrics', methods=['GET'], strict_slashes=False)
+async def metrics() -> str:
+    """
+    Return throttling, hashing and session cache metrics
+    """
+    stats = {}
+    stats.update(login_throttle.stats())
+    stats.update(hasher.stats())
+    stats.update(AUTH.session_cache_stats())
+    return jsonify(stats)
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Async authentication module, Auth for the async app
+"""
+from datetime import datetime, timedelta
+from typing import Union
+
+from async_db import AsyncDB
+from auth import _generate_uuid
+from config import env
+from hasher import hasher
+from session_cache import SessionCache
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import NoResultFound
+from user import User
+
+
+class AsyncAuth:
+    """AsyncAuth class to interact with the authentication database
+    from coroutines, bcrypt runs on the hasher pool
+    """
+
+    def __init__(self) -> None:
+        """Initialize a new instance of the AsyncAuth class."""
+        self._db = AsyncDB()
+        self._session_cache = SessionCache(
+            env('SESSION_CACHE_SIZE', 10000, int),
+            env('SESSION_CACHE_TTL', 30.0, float))
+        self._session_duration = timedelta(
+            seconds=env('SESSION_DURATION', 86400, int))
+        self._reset_token_duration = timedelta(
+            seconds=env('RESET_TOKEN_DURATION', 3600, int))
+
+    async def setup(self) -> None:
+        """Create the missing tables, called once at startup."""
+        await self._db.setup()
+
+    async def close(self) -> None:
+        """Close the database connections, called once at shutdown."""
+        await self._db.close()
+
+    async def register_user(self, email: str, password: str) -> User:
+        """Register a new user with the provided email and password
+        Returns:
+            User: The user object representing the newly created user.
+        Raises:
+            ValueError: If a user with the given email already exists.
+        """
+        hashed = await hasher.hash_async(password)
+        try:
+            return await self._db.add_user(email, hashed)
+        except IntegrityError:
+            raise ValueError(f"User {email} already exists")
+
+    async def valid_login(self, email: str, password: str) -> bool:
+        """Validates the login credentials for a user
+        Returns:
+            bool: True if the credentials are correct, otherwise False.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return False
+        return await hasher.verify_async(password, user.hashed_password)
+
+    async def create_session(self, email: str) -> Union[None, str]:
+        """Creates a session for a user with the provided email.
+        Returns:
+            Union[None, str]: session ID if the user is found, None otherwise
+        """
+        session_id = _generate_uuid()
+        now = datetime.utcnow()
+        if not await self._db.add_session(email, session_id, now,
+                                          now + self._session_duration):
+            return None
+        return session_id
+
+    async def get_user_from_session_id(self, session_id: str):
+        """Find a user by session ID and return the corresponding User object.
+        Returns:
+        Union[User, None]: corresponding User object if found, None otherwise
+        """
+        if session_id is None:
+            return None
+        cached = self._session_cache.get(session_id)
+        if cached is not None:
+            return User(id=cached[0], email=cached[1])
+        version = self._session_cache.version
+        try:
+            user_session = await self._db.find_session(session_id)
+        except NoResultFound:
+            return None
+        remaining = (user_session.expires_at -
+                     datetime.utcnow()).total_seconds()
+        if remaining <= 0:
+            return None
+        user = user_session.user
+        self._session_cache.set(session_id, user.id, user.email, version,
+                                remaining)
+        return user
+
+    async def destroy_session(self, user_id: int,
+                              session_id: str = None) -> None:
+        """Destroy a user's sessions, or only session_id."""
+        if user_id is None:
+            return None
+        await self._db.remove_sessions(user_id, session_id)
+        if session_id is None:
+            self._session_cache.discard_user(user_id)
+        else:
+            self._session_cache.discard(session_id)
+
+    async def get_reset_password_token(self, email: str) -> str:
+        """Generate a reset password token for a user with the provided email.
+        Raises:
+            ValueError: If the user with the provided email is not found.
+        """
+        reset_token = _generate_uuid()
+        expires_at = datetime.utcnow() + self._reset_token_duration
+        if await self._db.update_user_by(
+                {"email": email}, reset_token=reset_token,
+                reset_token_expires_at=expires_at) == 0:
+            raise ValueError('User not found')
+        return reset_token
+
+    async def update_password(self, reset_token: str, password: str) -> None:
+        """Update user's password by providing reset token & new password
+        Raises:
+            ValueError: If the reset token is invalid or expired.
+        """
+        if reset_token is None:
+            raise ValueError('Invalid reset token')
+        try:
+            user = await self._db.find_user_by(reset_token=reset_token)
+        except NoResultFound:
+            raise ValueError('Invalid reset token')
+        expires_at = user.reset_token_expires_at
+        if expires_at is None or expires_at <= datetime.utcnow():
+            raise ValueError('Invalid reset token')
+        hashed_password = await hasher.hash_async(password)
+        if await self._db.update_user_by(
+                {"id": user.id, "reset_token": reset_token},
+                hashed_password=hashed_password, reset_token=None,
+                reset_token_expires_at=None) == 0:
+            raise ValueError('Invalid reset token')
+        self._session_cache.discard_user(user.id)
+
+    def session_cache_stats(self) -> dict:
+        """Return the session cache hit and miss counters
+        """
+        return self._session_cache.stats()
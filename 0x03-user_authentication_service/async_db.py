@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""AsyncDB module, the DB operations of the async app on an asyncio
+SQLAlchemy engine. Requires SQLAlchemy 1.4+ and aiosqlite for SQLite
+"""
+import os
+from datetime import datetime
+from typing import Any, Dict
+from sqlalchemy import DateTime, delete, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from db import (apply_sqlite_profile, query_cache_args, sqlite_connect_args,
+                sqlite_profile)
+from user import Base, User
+from user_session import UserSession
+
+
+def async_url(url: str) -> str:
+    """Return the asyncio driver URL of a database URL
+    Args:
+        url: engine URL as used by DB
+    Returns:
+        str: the same database with the aiosqlite driver for SQLite
+    """
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+
+class AsyncDB:
+    """AsyncDB class for interacting with the database from coroutines.
+    setup() creates missing tables, databases made by an older schema
+    are migrated by DB
+    """
+
+    def __init__(self, url: str = None) -> None:
+        """Initialize a new AsyncDB instance
+        Args:
+            url: engine URL, from DB_URL, sqlite:///a.db by default
+        """
+        if url is None:
+            url = os.getenv("DB_URL", "sqlite:///a.db")
+        kwargs = query_cache_args()
+        pragmas = {}
+        if url.startswith("sqlite"):
+            pragmas = sqlite_profile()
+            kwargs["connect_args"] = sqlite_connect_args()
+        self._engine = create_async_engine(async_url(url), **kwargs)
+        apply_sqlite_profile(self._engine.sync_engine, pragmas)
+        self._sessionmaker = sessionmaker(self._engine, class_=AsyncSession,
+                                          expire_on_commit=False)
+
+    async def setup(self) -> None:
+        """Create the tables missing from the database"""
+        async with self._engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def close(self) -> None:
+        """Close every pooled connection"""
+        await self._engine.dispose()
+
+    async def add_user(self, email: str, hashed_password: bytes) -> User:
+        """
+        Add a new user to the database
+        Args:
+            email: Email of the user
+            hashed_password: Hashed password of the user
+        Returns:
+            User: User object representing the newly added user
+        Raises:
+            IntegrityError: If the email is already registered
+        """
+        user = User(email=email, hashed_password=hashed_password)
+        async with self._sessionmaker() as session:
+            session.add(user)
+            await session.commit()
+        return user
+
+    async def find_user_by(self, **kwargs) -> User:
+        """
+        Find a user in the database based on the provided arguments
+        Args:
+            **kwargs: keyword arguments to filter the user query
+        Returns:
+            User: User object representing the found user
+        Raises:
+            NoResultFound: If no user is found
+            InvalidRequestError: If an invalid query argument is used
+        """
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                select(User).filter_by(**kwargs))
+            return result.scalars().one()
+
+    async def update_user_by(self, filter: Dict[str, Any],
+                             **values) -> int:
+        """
+        Update the users matching filter in a single UPDATE statement
+        Args:
+            filter: column values the users must match
+            **values: column values to set
+        Raises:
+            ValueError: If an invalid attribute is provided
+        Returns:
+            int: number of users updated
+        """
+        columns = User.__table__.columns
+        for key in list(filter) + list(values):
+            if key not in columns:
+                raise ValueError()
+        statement = update(User).filter_by(**filter).values(
+            **values).execution_options(synchronize_session=False)
+        async with self._sessionmaker() as session:
+            count = (await session.execute(statement)).rowcount
+            await session.commit()
+        return count
+
+    async def add_session(self, email: str, session_id: str,
+                          created_at: datetime,
+                          expires_at: datetime) -> bool:
+        """
+        Add a session for the user with this email in a single
+        INSERT ... SELECT statement
+        Returns:
+            bool: True if the user exists and the session was added
+        """
+        query = select(User.id, literal(session_id),
+                       literal(created_at, DateTime),
+                       literal(expires_at, DateTime)).where(
+                           User.email == email)
+        statement = insert(UserSession).from_select(
+            ["user_id", "id", "created_at", "expires_at"], query)
+        async with self._sessionmaker() as session:
+            count = (await session.execute(statement)).rowcount
+            await session.commit()
+        return count > 0
+
+    async def find_session(self, session_id: str) -> UserSession:
+        """
+        Find a session and its user
+        Returns:
+            UserSession: the session, with its user loaded
+        Raises:
+            NoResultFound: If no session has this id
+        """
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                select(UserSession).filter_by(id=session_id))
+            return result.scalars().unique().one()
+
+    async def remove_sessions(self, user_id: int,
+                              session_id: str = None) -> int:
+        """
+        Remove the sessions of a user, or only one of them
+        Returns:
+            int: number of sessions removed
+        """
+        statement = delete(UserSession).where(
+            UserSession.user_id == user_id)
+        if session_id is not None:
+            statement = statement.where(UserSession.id == session_id)
+        async with self._sessionmaker() as session:
+            count = (await session.execute(statement)).rowcount
+            await session.commit()
+        return count
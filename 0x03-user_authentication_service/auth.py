@@ -3,25 +3,29 @@
 Authentication module
 """
 
-import bcrypt
+from config import env
+from datetime import datetime, timedelta
 from db import DB
+from hasher import hasher
+from session_cache import SessionCache
 from user import User
 from uuid import uuid4
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
 from typing import Union
 import uuid
 
 
 def _hash_password(password: str) -> bytes:
-    """Hashes the given password using bcrypt
+    """Hashes the given password using bcrypt on the hasher pool
     Args:
         password (str): The password to hash
     Returns:
         bytes: The hashed password
+    Raises:
+        concurrent.futures.TimeoutError: If hashing took too long
     """
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed
+    return hasher.hash(password)
 
 
 def _generate_uuid() -> str:
@@ -39,6 +43,19 @@ class Auth:
     def __init__(self) -> None:
         """Initialize a new instance of the Auth class."""
         self._db = DB()
+        self._session_cache = SessionCache(
+            env('SESSION_CACHE_SIZE', 10000, int),
+            env('SESSION_CACHE_TTL', 30.0, float))
+        self._session_duration = timedelta(
+            seconds=env('SESSION_DURATION', 86400, int))
+        self._reset_token_duration = timedelta(
+            seconds=env('RESET_TOKEN_DURATION', 3600, int))
+
+    def release(self) -> None:
+        """Release the database session of the calling thread, called
+        at the end of every request
+        """
+        self._db.remove_session()
 
     def register_user(self, email: str, password: str) -> User:
         """Register a new user with the provided email and password
@@ -50,13 +67,11 @@ class Auth:
         Raises:
             ValueError: If a user with the given email already exists.
         """
+        hashed = _hash_password(password)
         try:
-            self._db.find_user_by(email=email)
-        except NoResultFound:
-            hashed = _hash_password(password)
-            usr = self._db.add_user(email, hashed)
-            return usr
-        raise ValueError(f"User {email} already exists")
+            return self._db.add_user(email, hashed)
+        except IntegrityError:
+            raise ValueError(f"User {email} already exists")
 
     def valid_login(self, email: str, password: str) -> bool:
         """Validates the login credentials for a user
@@ -65,15 +80,15 @@ class Auth:
             password (str): The password of the user.
         Returns:
             bool: True if the credentials are correct, otherwise False.
+        Raises:
+            concurrent.futures.TimeoutError: If verifying took too long
         """
         try:
             user = self._db.find_user_by(email=email)
         except NoResultFound:
             return False
 
-        user_password = user.hashed_password
-        passwd = password.encode("utf-8")
-        return bcrypt.checkpw(passwd, user_password)
+        return hasher.verify(password, user.hashed_password)
 
     def create_session(self, email: str) -> Union[None, str]:
         """Creates a session for a user with the provided email.
@@ -82,13 +97,11 @@ class Auth:
         Returns:
             Union[None, str]: session ID if the user is found, None otherwise
         """
-        try:
-            user = self._db.find_user_by(email=email)
-        except NoResultFound:
-            return None
-
         session_id = _generate_uuid()
-        self._db.update_user(user.id, session_id=session_id)
+        now = datetime.utcnow()
+        if not self._db.add_session(email, session_id, now,
+                                    now + self._session_duration):
+            return None
         return session_id
 
     def get_user_from_session_id(self, session_id):
@@ -98,25 +111,60 @@ class Auth:
         Returns:
         Union[User, None]: corresponding User object if found, None otherwise
         """
-        user = None
         if session_id is None:
             return None
+        cached = self._session_cache.get(session_id)
+        if cached is not None:
+            return User(id=cached[0], email=cached[1])
+        version = self._session_cache.version
         try:
-            user = self._db.find_user_by(session_id=session_id)
+            user_session = self._db.find_session(session_id)
         except NoResultFound:
             return None
+        remaining = (user_session.expires_at -
+                     datetime.utcnow()).total_seconds()
+        if remaining <= 0:
+            return None
+        user = user_session.user
+        self._session_cache.set(session_id, user.id, user.email, version,
+                                remaining)
         return user
 
-    def destroy_session(self, user_id: int) -> None:
-        """Destroy a user's session by providing the user_id.
+    def destroy_session(self, user_id: int, session_id: str = None) -> None:
+        """Destroy a user's sessions by providing the user_id.
         Args:
             user_id (int): ID of user whose session needs to be destroyed
+            session_id (str): only destroy this session of the user
         Returns:
             None
         """
         if user_id is None:
             return None
-        self._db.update_user(user_id, session_id=None)
+        self._db.remove_sessions(user_id, session_id)
+        if session_id is None:
+            self._session_cache.discard_user(user_id)
+        else:
+            self._session_cache.discard(session_id)
+
+    def purge_expired_sessions(self, batch_size: int = 1000) -> int:
+        """Remove expired sessions from the database in batches.
+        Args:
+            batch_size (int): most sessions removed per transaction
+        Returns:
+            int: number of sessions removed
+        """
+        return self._db.purge_expired_sessions(datetime.utcnow(),
+                                               batch_size)
+
+    def purge_expired_reset_tokens(self, batch_size: int = 1000) -> int:
+        """Clear expired reset tokens from the database in batches.
+        Args:
+            batch_size (int): most tokens cleared per transaction
+        Returns:
+            int: number of tokens cleared
+        """
+        return self._db.purge_expired_reset_tokens(datetime.utcnow(),
+                                                   batch_size)
 
     def get_reset_password_token(self, email: str) -> str:
         """Generate a reset password token for a user with the provided email.
@@ -127,15 +175,12 @@ class Auth:
         Raises:
             ValueError: If the user with the provided email is not found.
         """
-        user = None
-        try:
-            user = self._db.find_user_by(email=email)
-        except NoResultFound:
-            user = None
-        if user is None:
-            raise ValueError('User not found')
         reset_token = _generate_uuid()
-        self._db.update_user(user.id, reset_token=reset_token)
+        expires_at = datetime.utcnow() + self._reset_token_duration
+        if self._db.update_user_by({"email": email},
+                                   reset_token=reset_token,
+                                   reset_token_expires_at=expires_at) == 0:
+            raise ValueError('User not found')
         return reset_token
 
     def update_password(self, reset_token: str, password: str) -> None:
@@ -146,17 +191,27 @@ class Auth:
         Returns:
             None
         Raises:
-            ValueError: If the reset token is invalid.
+            ValueError: If the reset token is invalid or expired.
         """
-        user = None
+        if reset_token is None:
+            raise ValueError('Invalid reset token')
         try:
             user = self._db.find_user_by(reset_token=reset_token)
         except NoResultFound:
-            user = None
-        if user is None:
+            raise ValueError('Invalid reset token')
+        expires_at = user.reset_token_expires_at
+        if expires_at is None or expires_at <= datetime.utcnow():
             raise ValueError('Invalid reset token')
         hashed_password = _hash_password(password)
-        self._db.update_user(
-            user.id,
-            hashed_password=hashed_password,
-            reset_token=None)
+        if self._db.update_user_by({"id": user.id,
+                                    "reset_token": reset_token},
+                                   hashed_password=hashed_password,
+                                   reset_token=None,
+                                   reset_token_expires_at=None) == 0:
+            raise ValueError('Invalid reset token')
+        self._session_cache.discard_user(user.id)
+
+    def session_cache_stats(self) -> dict:
+        """Return the session cache hit and miss counters
+        """
+        return self._session_cache.stats()
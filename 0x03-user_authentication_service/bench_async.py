@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Compare GET /profile throughput of the Flask app and the async app
+under many concurrent connections. Both servers share one fresh
+database, the session cache is disabled so every request reaches it.
+Usage: ./bench_async.py [connections] [seconds]
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+SERVERS = {
+    "flask": [sys.executable, "-c",
+              "from app import app; app.run(port={port}, threaded=True)"],
+    "asgi": [sys.executable, "-m", "hypercorn", "async_app:app",
+             "-b", "127.0.0.1:{port}"],
+}
+
+
+def start(name: str, port: int, env: dict) -> subprocess.Popen:
+    """Start a server and wait until it answers"""
+    command = [arg.format(port=port) for arg in SERVERS[name]]
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            urllib.request.urlopen("http://127.0.0.1:{}/".format(port))
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("{} did not start".format(name))
+
+
+def log_in(port: int) -> str:
+    """Register the benchmark user once and return a session ID"""
+    url = "http://127.0.0.1:{}".format(port)
+    data = urllib.parse.urlencode({"email": "bench@example.com",
+                                   "password": "pwd"}).encode()
+    try:
+        urllib.request.urlopen(url + "/users", data)
+    except OSError:
+        pass
+    response = urllib.request.urlopen(url + "/sessions", data)
+    cookie = response.headers["Set-Cookie"]
+    return cookie.split(";")[0].split("=", 1)[1]
+
+
+async def client(port: int, session_id: str, deadline: float) -> int:
+    """Send GET /profile over one keep-alive connection until deadline,
+    reconnecting when the server closes it, return the responses read
+    """
+    request = ("GET /profile HTTP/1.1\r\nHost: 127.0.0.1\r\n"
+               "Cookie: session_id={}\r\n\r\n").format(session_id).encode()
+    done = 0
+    reader = writer = None
+    while time.monotonic() < deadline:
+        if writer is None:
+            reader, writer = await asyncio.open_connection("127.0.0.1",
+                                                           port)
+        writer.write(request)
+        head = await reader.readuntil(b"\r\n\r\n")
+        assert head.startswith(b"HTTP/1.1 200"), head
+        length = 0
+        for line in head.lower().split(b"\r\n"):
+            if line.startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        done += 1
+        if b"connection: close" in head.lower():
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+    return done
+
+
+async def load(port: int, session_id: str, connections: int,
+               seconds: float) -> float:
+    """Return requests per second over connections clients"""
+    deadline = time.monotonic() + seconds
+    counts = await asyncio.gather(*(client(port, session_id, deadline)
+                                    for _ in range(connections)))
+    return sum(counts) / seconds
+
+
+if __name__ == "__main__":
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    env = dict(os.environ, SESSION_CACHE_SIZE="0", DB_URL="sqlite:///{}"
+               .format(os.path.join(tempfile.mkdtemp(), "bench.db")))
+    for port, name in enumerate(SERVERS, 5601):
+        server = start(name, port, env)
+        try:
+            session_id = log_in(port)
+            rate = asyncio.run(load(port, session_id, connections, seconds))
+            print("{:>5}: {:8.1f} req/s with {} connections".format(
+                name, rate, connections))
+        finally:
+            server.terminate()
+            server.wait()
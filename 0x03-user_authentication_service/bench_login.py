@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Login throughput benchmark: Auth.valid_login from many client threads
+with the hasher pool sized from one worker up to the number of cores.
+Usage: ./bench_login.py [logins] [clients]
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ["DB_URL"] = "sqlite:///{}".format(
+    os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+import auth  # noqa: E402
+from hasher import Hasher  # noqa: E402
+
+
+def run(instance: auth.Auth, logins: int, clients: int) -> float:
+    """Return logins per second over logins concurrent valid_login"""
+    def login(_):
+        assert instance.valid_login("bench@example.com", "pwd")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(login, range(logins)))
+    return logins / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    cores = os.cpu_count() or 1
+    instance = auth.Auth()
+    instance.register_user("bench@example.com", "pwd")
+    sizes = sorted({1, 2, cores // 2, cores} - {0})
+    print("{} cores, {} logins from {} clients".format(cores, logins,
+                                                       clients))
+    for kind in ("inline", "thread", "process"):
+        for workers in ([1] if kind == "inline" else sizes):
+            auth.hasher = Hasher(kind, workers, 60.0)
+            rate = run(instance, logins, clients)
+            print("{:>7} x{:<3} {:8.1f} logins/s".format(kind, workers,
+                                                         rate))
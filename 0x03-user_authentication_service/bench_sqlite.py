@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Registration and login throughput of DB without the SQLite profile,
+with it, and with it plus group commit. bcrypt is left out, a login is
+the user lookup plus the session insert.
+Usage: ./bench_sqlite.py [users] [threads]
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from db import DB
+
+HASHED = b"$2b$12$" + b"x" * 53
+
+
+def rate(db: DB, fn, count: int, threads: int) -> float:
+    """Return calls per second of fn(i) for i in range(count)"""
+    def run(i):
+        try:
+            fn(i)
+        finally:
+            db.remove_session()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(run, range(count)))
+    return count / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    for profile, group_commit in (("false", "false"), ("true", "false"),
+                                  ("true", "true")):
+        os.environ["SQLITE_PROFILE"] = profile
+        os.environ["DB_GROUP_COMMIT"] = group_commit
+        db = DB("sqlite:///{}".format(
+            os.path.join(tempfile.mkdtemp(), "bench.db")), reset=True)
+
+        def register(i):
+            db.add_user("user{}@example.com".format(i), HASHED)
+
+        def login(i):
+            email = "user{}@example.com".format(i)
+            db.find_user_by(email=email)
+            now = datetime.utcnow()
+            db.add_session(email, str(uuid4()), now,
+                           now + timedelta(days=1))
+
+        print("SQLITE_PROFILE={:<5} DB_GROUP_COMMIT={:<5}: {:8.1f} "
+              "registrations/s, {:8.1f} logins/s ({} threads)".format(
+                  profile, group_commit, rate(db, register, count, threads),
+                  rate(db, login, count, threads), threads))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark user lookups by email, session_id and reset_token with and
+without the users indexes.
+Usage: ./bench_users.py [users] [lookups]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from db import DB
+from user import User
+
+
+def populate(url: str, count: int) -> None:
+    """Insert count users in chunks, bypassing the ORM"""
+    engine = create_engine(url)
+    hashed = "$2b$12$" + "x" * 53
+    with engine.begin() as conn:
+        for start in range(0, count, 50000):
+            conn.execute(User.__table__.insert(), [
+                {"email": "user{}@example.com".format(i),
+                 "hashed_password": hashed,
+                 "session_id": "session-{}".format(i),
+                 "reset_token": "token-{}".format(i)}
+                for i in range(start, min(start + 50000, count))])
+    engine.dispose()
+
+
+def drop_indexes(url: str) -> None:
+    """Drop the users indexes, as in a database created before them"""
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        for index in User.__table__.indexes:
+            conn.execute(text("DROP INDEX {}".format(index.name)))
+    engine.dispose()
+
+
+def bench(find_user_by, count: int, lookups: int) -> None:
+    """Time lookups on each indexed column"""
+    keys = [random.randrange(count) for _ in range(lookups)]
+    for column, fmt in (("email", "user{}@example.com"),
+                        ("session_id", "session-{}"),
+                        ("reset_token", "token-{}")):
+        start = time.perf_counter()
+        for i in keys:
+            find_user_by(**{column: fmt.format(i)})
+        elapsed = time.perf_counter() - start
+        print("  find_user_by({}): {:.3f} ms/lookup".format(
+            column, elapsed * 1000 / lookups))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    url = "sqlite:///{}".format(
+        os.path.join(tempfile.mkdtemp(), "bench.db"))
+    DB(url, reset=True)
+    start = time.perf_counter()
+    populate(url, count)
+    print("{} users inserted in {:.1f} s".format(
+        count, time.perf_counter() - start))
+
+    drop_indexes(url)
+    engine = create_engine(url)
+    session = sessionmaker(bind=engine)()
+    print("without indexes:")
+    bench(lambda **kwargs: session.query(User).filter_by(**kwargs).one(),
+          count, min(lookups, 20))
+    session.close()
+    engine.dispose()
+
+    start = time.perf_counter()
+    db = DB(url)
+    print("indexes migrated in place in {:.1f} s".format(
+        time.perf_counter() - start))
+    print("with indexes:")
+    bench(db.find_user_by, count, lookups)
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Settings read from the environment
+"""
+import os
+
+
+def env(name: str, default, cast):
+    """
+    Read a setting from the environment
+    Args:
+        name (str): environment variable
+        default: value when the variable is unset or invalid
+        cast: converts the variable's string value
+    Return:
+        the converted value or default
+    """
+    try:
+        return cast(os.getenv(name))
+    except Exception:
+        return default
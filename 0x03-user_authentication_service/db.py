@@ -1,32 +1,199 @@
 #!/usr/bin/env python3
 """DB module
 """
-from sqlalchemy import create_engine
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict
+import sqlalchemy
+from sqlalchemy import (DateTime, and_, create_engine, event, inspect,
+                        literal, or_, select, text)
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm.session import Session
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
 from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.pool import QueuePool
+from group_commit import GroupCommitter
 from user import Base, User
+from user_session import UserSession
+
+
+POOL_SETTINGS = {
+    "DB_POOL_SIZE": ("pool_size", int),
+    "DB_MAX_OVERFLOW": ("max_overflow", int),
+    "DB_POOL_TIMEOUT": ("pool_timeout", float),
+    "DB_POOL_RECYCLE": ("pool_recycle", int),
+}
+SQLITE_PRAGMAS = {
+    "journal_mode": ("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": ("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": ("SQLITE_MMAP_SIZE", "268435456"),
+    "cache_size": ("SQLITE_CACHE_SIZE", "-65536"),
+    "busy_timeout": ("SQLITE_BUSY_TIMEOUT", "5000"),
+}
+
+
+def sqlite_profile() -> Dict[str, str]:
+    """Return the PRAGMA settings applied to every SQLite connection,
+    empty when SQLITE_PROFILE=false. Each one can be overridden, or
+    skipped when set to an empty string, with its environment variable
+    """
+    if os.getenv("SQLITE_PROFILE", "true").lower() != "true":
+        return {}
+    pragmas = {}
+    for pragma, (name, default) in SQLITE_PRAGMAS.items():
+        value = os.getenv(name, default)
+        if value:
+            pragmas[pragma] = value
+    return pragmas
+
+
+def apply_sqlite_profile(engine: Engine, pragmas: Dict[str, str]) -> None:
+    """Run the pragmas on every new DBAPI connection of engine"""
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute("PRAGMA {}={}".format(pragma, value))
+        cursor.close()
+
+
+def sqlite_connect_args() -> Dict[str, Any]:
+    """Return the sqlite3 connect arguments: connections are shared by
+    the pool across threads and keep SQLITE_CACHED_STATEMENTS prepared
+    statements each
+    """
+    try:
+        cached = int(os.getenv("SQLITE_CACHED_STATEMENTS"))
+    except Exception:
+        cached = 256
+    return {"check_same_thread": False, "cached_statements": cached}
+
+
+def query_cache_args() -> Dict[str, Any]:
+    """Return the create_engine argument sizing SQLAlchemy's compiled
+    statement cache (1.4+), DB_QUERY_CACHE_SIZE entries. The queries of
+    DB and AsyncDB compile to a few dozen distinct statements
+    """
+    version = sqlalchemy.__version__.split(".")[:2]
+    if tuple(int(part) for part in version) < (1, 4):
+        return {}
+    try:
+        return {"query_cache_size": int(os.getenv("DB_QUERY_CACHE_SIZE"))}
+    except Exception:
+        return {"query_cache_size": 100}
 
 
 class DB:
     """DB class for interacting with the database"""
 
-    def __init__(self) -> None:
-        """Initialize a new DB instance"""
-        self._engine = create_engine("sqlite:///a.db")
-        Base.metadata.drop_all(self._engine)
+    def __init__(self, url: str = None, reset: bool = None) -> None:
+        """Initialize a new DB instance. With DB_GROUP_COMMIT=true SQLite
+        runs with synchronous=FULL: a caller is told its write is done
+        once its batch commits, so the commit must be on disk
+        Args:
+            url: engine URL, from DB_URL, sqlite:///a.db by default
+            reset: drop and recreate the schema, from DB_RESET, false by
+                default
+        """
+        if url is None:
+            url = os.getenv("DB_URL", "sqlite:///a.db")
+        if reset is None:
+            reset = os.getenv("DB_RESET", "false").lower() == "true"
+        kwargs = {}
+        for name, (option, cast) in POOL_SETTINGS.items():
+            if os.getenv(name) is not None:
+                kwargs[option] = cast(os.getenv(name))
+        group_commit = os.getenv("DB_GROUP_COMMIT", "false").lower() == "true"
+        pragmas = {}
+        if url.startswith("sqlite"):
+            pragmas = sqlite_profile()
+            if group_commit:
+                pragmas["synchronous"] = "FULL"
+            in_memory = url == "sqlite://" or ":memory:" in url
+            if (kwargs or pragmas) and not in_memory:
+                kwargs["poolclass"] = QueuePool
+            kwargs["connect_args"] = sqlite_connect_args()
+        kwargs.update(query_cache_args())
+        self._engine = create_engine(url, **kwargs)
+        apply_sqlite_profile(self._engine, pragmas)
+        if reset:
+            Base.metadata.drop_all(self._engine)
         Base.metadata.create_all(self._engine)
-        self.__session = None
+        self._migrate()
+        self.__session = scoped_session(sessionmaker(bind=self._engine))
+        self._committer = None
+        if group_commit:
+            try:
+                size = int(os.getenv("DB_GROUP_COMMIT_SIZE"))
+            except Exception:
+                size = 64
+            try:
+                interval = float(os.getenv("DB_GROUP_COMMIT_INTERVAL"))
+            except Exception:
+                interval = 0.002
+            self._committer = GroupCommitter(self._engine, size, interval)
+
+    def _migrate(self) -> None:
+        """Add the nullable columns and create the indexes declared on
+        the models that are missing from tables created by an older
+        version of the schema
+        """
+        inspector = inspect(self._engine)
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"]
+                        for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    with self._engine.begin() as conn:
+                        conn.execute(text(
+                            "ALTER TABLE {} ADD COLUMN {} {}".format(
+                                table.name, column.name,
+                                column.type.compile(self._engine.dialect))))
+            existing = {index["name"]
+                        for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=self._engine)
 
     @property
     def _session(self) -> Session:
-        """Memoized session object"""
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        """Session object of the calling thread"""
+        return self.__session()
+
+    def _write(self, operation: Callable[[Connection], Any]) -> Any:
+        """Run operation on the group committer and wait until its batch
+        is committed. The thread's session ends its transaction first so
+        its read locks never hold up the batch
+        """
+        self._session.commit()
+        return self._committer.submit(operation).result()
+
+    def _execute(self, statement) -> int:
+        """Execute and commit an INSERT or UPDATE statement
+        Returns:
+            int: number of rows it changed
+        """
+        if self._committer is not None:
+            return self._write(
+                lambda conn: conn.execute(statement).rowcount)
+        try:
+            count = self._session.execute(statement).rowcount
+            self._session.commit()
+        except IntegrityError:
+            self._session.rollback()
+            raise
+        return count
+
+    def remove_session(self) -> None:
+        """Close the session of the calling thread, at the end of a
+        request or when the thread is done with the database
+        """
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """
@@ -36,10 +203,23 @@ class DB:
             hashed_password: Hashed password of the user
         Returns:
             User: User object representing the newly added user
+        Raises:
+            IntegrityError: If the email is already registered
         """
+        if self._committer is not None:
+            statement = User.__table__.insert().values(
+                email=email, hashed_password=hashed_password)
+            user_id = self._write(
+                lambda conn: conn.execute(statement).inserted_primary_key[0])
+            return User(id=user_id, email=email,
+                        hashed_password=hashed_password)
         user = User(email=email, hashed_password=hashed_password)
         self._session.add(user)
-        self._session.commit()
+        try:
+            self._session.commit()
+        except IntegrityError:
+            self._session.rollback()
+            raise
         return user
 
     def find_user_by(self, **kwargs) -> User:
@@ -69,12 +249,139 @@ class DB:
             **kwargs: Keyword arguments for user attribute updates
         Raises:
             ValueError: If an invalid attribute is provided
+            NoResultFound: If no user has this id
         Returns: None
         """
-        user: User = self.find_user_by(id=user_id)
-        for key in kwargs:
-            if hasattr(user, key):
-                setattr(user, key, kwargs[key])
-            else:
+        if self.update_user_by({"id": user_id}, **kwargs) == 0:
+            raise NoResultFound()
+
+    def update_user_by(self, filter: Dict[str, Any], **values) -> int:
+        """
+        Update the users matching filter in a single UPDATE statement,
+        without loading them
+        Args:
+            filter: column values the users must match
+            **values: column values to set
+        Raises:
+            ValueError: If an invalid attribute is provided
+        Returns:
+            int: number of users updated
+        """
+        columns = User.__table__.columns
+        for key in list(filter) + list(values):
+            if key not in columns:
                 raise ValueError()
+        if not values:
+            return self._session.query(User).filter_by(**filter).count()
+        statement = User.__table__.update().where(and_(
+            *[columns[key] == value for key, value in filter.items()]
+        )).values(**values)
+        return self._execute(statement)
+
+    def add_session(self, email: str, session_id: str,
+                    created_at: datetime, expires_at: datetime) -> bool:
+        """
+        Add a session for the user with this email in a single
+        INSERT ... SELECT statement
+        Args:
+            email: Email of the user
+            session_id: ID of the new session
+            created_at: creation time of the session
+            expires_at: time after which the session is no longer valid
+        Returns:
+            bool: True if the user exists and the session was added
+        """
+        query = select([User.id, literal(session_id),
+                        literal(created_at, DateTime),
+                        literal(expires_at, DateTime)]).where(
+                            User.email == email)
+        statement = UserSession.__table__.insert().from_select(
+            ["user_id", "id", "created_at", "expires_at"], query)
+        return self._execute(statement) > 0
+
+    def find_session(self, session_id: str) -> UserSession:
+        """
+        Find a session and its user
+        Args:
+            session_id: ID of the session
+        Returns:
+            UserSession: the session, with its user loaded
+        Raises:
+            NoResultFound: If no session has this id
+        """
+        return self._session.query(UserSession).filter_by(
+            id=session_id).one()
+
+    def remove_sessions(self, user_id: int, session_id: str = None) -> int:
+        """
+        Remove the sessions of a user, or only one of them
+        Args:
+            user_id: ID of the user
+            session_id: ID of the only session to remove
+        Returns:
+            int: number of sessions removed
+        """
+        query = self._session.query(UserSession).filter_by(user_id=user_id)
+        if session_id is not None:
+            query = query.filter_by(id=session_id)
+        count = query.delete(synchronize_session=False)
         self._session.commit()
+        return count
+
+    def purge_expired_sessions(self, now: datetime,
+                               batch_size: int = 1000) -> int:
+        """
+        Remove the sessions expired at now, batch_size rows per
+        transaction so writers are never blocked for long
+        Args:
+            now: current time
+            batch_size: most sessions removed per transaction
+        Returns:
+            int: number of sessions removed
+        Raises:
+            ValueError: If batch_size is lower than 1
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        table = UserSession.__table__
+        expired = select([table.c.id]).where(
+            table.c.expires_at <= now).limit(batch_size)
+        statement = table.delete().where(table.c.id.in_(expired))
+        total = 0
+        while True:
+            count = self._session.execute(statement).rowcount
+            self._session.commit()
+            total += count
+            if count < batch_size:
+                return total
+
+    def purge_expired_reset_tokens(self, now: datetime,
+                                   batch_size: int = 1000) -> int:
+        """
+        Clear the reset tokens expired at now, and those stored without
+        an expiry by older versions, batch_size users per UPDATE
+        Args:
+            now: current time
+            batch_size: most users updated per transaction
+        Returns:
+            int: number of tokens cleared
+        Raises:
+            ValueError: If batch_size is lower than 1
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        table = User.__table__
+        expires_at = table.c.reset_token_expires_at
+        expired = select([table.c.id]).where(or_(
+            expires_at <= now,
+            and_(table.c.reset_token.isnot(None), expires_at.is_(None))
+        )).limit(batch_size)
+        statement = table.update().where(table.c.id.in_(expired)).values(
+            reset_token=None, reset_token_expires_at=None)
+        total = 0
+        while True:
+            count = self._session.execute(statement).rowcount
+            self._session.commit()
+            total += count
+            if count < batch_size:
+                return total
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Group commit: writes from many threads committed together in one
+transaction by a single committer thread
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Tuple
+
+from sqlalchemy.engine import Connection, Engine
+
+
+class GroupCommitter:
+    """
+    Queues write operations and commits them in batches. A batch is
+    closed after size operations or interval seconds after its first
+    one, whichever comes first. The future of every operation completes
+    once its batch is committed. When a batch fails, its operations are
+    retried one transaction each, so one bad write (a duplicate email)
+    only fails its own caller
+    """
+    def __init__(self, engine: Engine, size: int, interval: float):
+        """
+        Initialize the committer and start its thread
+        Args:
+            engine (Engine): engine the batches are committed on
+            size (int): most operations in a batch
+            interval (float): seconds a batch stays open for more writes
+        """
+        self.engine = engine
+        self.size = max(size, 1)
+        self.interval = interval
+        self._queue = queue.Queue()
+        self.batches = 0
+        self.operations = 0
+        threading.Thread(target=self._run, name="group-commit",
+                         daemon=True).start()
+
+    def submit(self, operation: Callable[[Connection], Any]) -> Future:
+        """
+        Queue operation, called with the batch's connection
+        Return:
+            a future resolved with the operation's return value once it
+            is committed, or with its exception
+        """
+        future = Future()
+        self._queue.put((operation, future))
+        return future
+
+    def _run(self):
+        """
+        Collect and commit batches forever
+        """
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Callable, Future]]):
+        """
+        Run and commit a batch in one transaction, falling back to one
+        transaction per operation if it fails
+        """
+        self.batches += 1
+        self.operations += len(batch)
+        try:
+            with self.engine.begin() as conn:
+                results = [operation(conn) for operation, _ in batch]
+        except Exception as error:
+            if len(batch) == 1:
+                batch[0][1].set_exception(error)
+                return
+            for operation, future in batch:
+                try:
+                    with self.engine.begin() as conn:
+                        result = operation(conn)
+                except Exception as failure:
+                    future.set_exception(failure)
+                else:
+                    future.set_result(result)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        """
+        Return the committer counters
+        """
+        return {
+            "group_commit_batches_total": self.batches,
+            "group_commit_operations_total": self.operations,
+            "group_commit_queue_depth": self._queue.qsize()
+        }
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Password hashing off the request thread, on a thread or process pool
+"""
+import asyncio
+import os
+import threading
+from concurrent import futures
+from concurrent.futures import (Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+
+import bcrypt
+
+from config import env
+
+
+def _hashpw(password: bytes) -> bytes:
+    """Hash password with a new salt, run by the pool workers
+    """
+    return bcrypt.hashpw(password, bcrypt.gensalt())
+
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
+    """Check password against hashed, run by the pool workers
+    """
+    return bcrypt.checkpw(password, hashed)
+
+
+class Hasher:
+    """
+    Submits bcrypt calls to an executor and waits for them with a
+    timeout. kind is "thread" (bcrypt releases the GIL), "process" or
+    "inline" to run in the caller's thread. The pool is created on
+    first use so it is never inherited across a fork
+    """
+    def __init__(self, kind: str, workers: int, timeout: float):
+        """
+        Initialize the hasher
+        Args:
+            kind (str): "thread", "process" or "inline"
+            workers (int): size of the pool
+            timeout (float): seconds a call may wait for its result
+        """
+        if kind not in ("thread", "process", "inline"):
+            raise ValueError("Unknown hash executor {}".format(kind))
+        self.kind = kind
+        self.workers = max(workers, 1)
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self.timeouts = 0
+
+    def _pool(self) -> Executor:
+        """
+        Return the executor, creating it on first use
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            self.workers, thread_name_prefix="hasher")
+        return self._executor
+
+    def _run(self, fn, *args):
+        """
+        Run fn on the pool and return its result
+        Raises:
+            concurrent.futures.TimeoutError: if it did not complete
+            within the timeout
+        """
+        if self.kind == "inline":
+            return fn(*args)
+        future = self._pool().submit(fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except futures.TimeoutError:
+            future.cancel()
+            self.timeouts += 1
+            raise
+
+    async def _run_async(self, fn, *args):
+        """
+        Run fn on the pool without blocking the event loop and return
+        its result
+        Raises:
+            asyncio.TimeoutError: if it did not complete within the
+            timeout
+        """
+        if self.kind == "inline":
+            return fn(*args)
+        future = asyncio.wrap_future(self._pool().submit(fn, *args))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def hash(self, password: str) -> bytes:
+        """
+        Return the bcrypt hash of password
+        """
+        return self._run(_hashpw, password.encode('utf-8'))
+
+    def verify(self, password: str, hashed: bytes) -> bool:
+        """
+        Return True if password matches hashed
+        """
+        return self._run(_checkpw, password.encode('utf-8'), hashed)
+
+    async def hash_async(self, password: str) -> bytes:
+        """
+        Return the bcrypt hash of password, from a coroutine
+        """
+        return await self._run_async(_hashpw, password.encode('utf-8'))
+
+    async def verify_async(self, password: str, hashed: bytes) -> bool:
+        """
+        Return True if password matches hashed, from a coroutine
+        """
+        return await self._run_async(_checkpw, password.encode('utf-8'),
+                                     hashed)
+
+    def stats(self) -> dict:
+        """
+        Return the hasher gauges and counters
+        """
+        return {
+            "hash_workers": self.workers,
+            "hash_timeouts_total": self.timeouts
+        }
+
+
+hasher = Hasher(
+    os.getenv('HASH_EXECUTOR', 'thread'),
+    env('HASH_WORKERS', os.cpu_count() or 1, int),
+    env('HASH_TIMEOUT', 5.0, float))
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Concurrency test: drive Auth from many threads against one database.
+Usage: ./main_concurrency.py [threads] [users per thread]
+"""
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+
+def worker(auth, n: int, count: int) -> int:
+    """Register, log in, read the profile, reset the password and log
+    out count users, return the number of users that went through
+    """
+    done = 0
+    try:
+        for i in range(count):
+            email = "user{}_{}@example.com".format(n, i)
+            auth.register_user(email, "pwd")
+            assert auth.valid_login(email, "pwd")
+            session_id = auth.create_session(email)
+            user = auth.get_user_from_session_id(session_id)
+            assert user is not None and user.email == email
+            token = auth.get_reset_password_token(email)
+            auth.update_password(token, "new pwd")
+            assert auth.valid_login(email, "new pwd")
+            auth.destroy_session(user.id)
+            assert auth.get_user_from_session_id(session_id) is None
+            done += 1
+    finally:
+        auth.release()
+    return done
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    path = os.path.join(tempfile.mkdtemp(), "concurrency.db")
+    os.environ["DB_URL"] = "sqlite:///{}".format(path)
+    os.environ.setdefault("DB_POOL_SIZE", str(threads))
+    from auth import Auth
+
+    auth = Auth()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(lambda n: worker(auth, n, count),
+                                range(threads)))
+    assert sum(results) == threads * count
+    print("OK: {} threads x {} users".format(threads, count))
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Clear expired password reset tokens in batches
+Usage: RESET_TOKEN_PURGE_BATCH=1000 ./purge_reset_tokens.py
+"""
+import os
+from time import perf_counter
+
+from auth import Auth
+
+
+if __name__ == "__main__":
+    try:
+        batch_size = int(os.getenv('RESET_TOKEN_PURGE_BATCH'))
+    except Exception:
+        batch_size = 1000
+    start = perf_counter()
+    purged = Auth().purge_expired_reset_tokens(batch_size)
+    elapsed = perf_counter() - start
+    print("Cleared {} expired reset tokens in {:.3f}s".format(
+        purged, elapsed))
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Purge expired sessions in batches
+Usage: SESSION_PURGE_BATCH=1000 ./purge_sessions.py
+"""
+import os
+from time import perf_counter
+
+from auth import Auth
+
+
+if __name__ == "__main__":
+    try:
+        batch_size = int(os.getenv('SESSION_PURGE_BATCH'))
+    except Exception:
+        batch_size = 1000
+    start = perf_counter()
+    purged = Auth().purge_expired_sessions(batch_size)
+    elapsed = perf_counter() - start
+    print("Purged {} expired sessions in {:.3f}s".format(purged, elapsed))
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Bounded TTL cache of session ID to user details
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Union
+
+
+class SessionCache:
+    """
+    Least recently used cache of session_id -> (user id, email). Entries
+    expire ttl seconds after they were stored and can be dropped per
+    user, by id or by email, when the user's session changes
+    """
+    def __init__(self, size: int, ttl: float):
+        """
+        Initialize the cache
+        Args:
+            size (int): most entries kept, 0 disables the cache
+            ttl (float): seconds an entry is served for
+        """
+        self.size = max(size, 0)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._owners = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.version = 0
+
+    def get(self, session_id: str) -> Optional[Tuple[int, str]]:
+        """
+        Return the (user id, email) cached for session_id
+        Return:
+            the details, or None on a miss or an expired entry
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(session_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, session_id: str, user_id: int, email: str,
+            version: int = None, ttl: float = None):
+        """
+        Cache the user details of session_id for ttl seconds at most.
+        When version is given the entry is only stored if nothing was
+        invalidated since the caller read self.version, so a lookup
+        racing a logout is not cached
+        """
+        if ttl is None or ttl > self.ttl:
+            ttl = self.ttl
+        if self.size == 0 or ttl <= 0:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._drop(session_id)
+            self._entries[session_id] = (time.monotonic() + ttl,
+                                         (user_id, email))
+            for owner in (user_id, email):
+                self._owners.setdefault(owner, set()).add(session_id)
+            while len(self._entries) > self.size:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def discard(self, session_id: str):
+        """
+        Drop the entry of session_id
+        """
+        with self._lock:
+            self.version += 1
+            self._drop(session_id)
+
+    def discard_user(self, owner: Union[int, str]):
+        """
+        Drop every entry of the user with this id or email
+        """
+        with self._lock:
+            self.version += 1
+            for session_id in list(self._owners.get(owner, ())):
+                self._drop(session_id)
+
+    def clear(self):
+        """
+        Drop every entry
+        """
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._owners.clear()
+
+    def _drop(self, session_id: str):
+        """
+        Remove session_id and its owner links, the lock must be held
+        """
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return
+        for owner in entry[1]:
+            sessions = self._owners.get(owner)
+            if sessions is not None:
+                sessions.discard(session_id)
+                if not sessions:
+                    del self._owners[owner]
+
+    def stats(self) -> dict:
+        """
+        Return the cache gauges and counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            "session_cache_size": len(self._entries),
+            "session_cache_hits_total": self.hits,
+            "session_cache_misses_total": self.misses,
+            "session_cache_evictions_total": self.evictions,
+            "session_cache_hit_rate":
+                round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+UserSession Model
+"""
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
+from user import Base, User
+
+
+class UserSession(Base):
+    """
+    Model representing the sessions table, one row per logged in device
+    """
+    __tablename__ = 'sessions'
+
+    id = Column(String(250), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'),
+                     nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    user = relationship(User, lazy='joined')
+
+    __table_args__ = (
+        Index('ix_sessions_user_id_expires_at', user_id, expires_at),
+    )